@@ -1,7 +1,15 @@
 from .connectwise import Connectwise
+from .records import record_class
 
 
 class Activity:
+    RECORD_FIELDS = (
+        'id', 'name', 'type', 'company', 'contact', 'phoneNumber', 'email', 'status', 'opportunity', 'ticket',
+        'agreement', 'campaign', 'notes', 'dateStart', 'dateEnd', 'assignedBy', 'assignTo', 'scheduleStatus',
+        'reminder', 'where', 'notifyFlag', 'mobileGuid', 'customFields', '_info',
+    )
+    DERIVED_ATTRIBUTES = ()
+
     def __init__(self, id, **kwargs):
         self.id = id
         for kwarg in kwargs:
@@ -11,22 +19,26 @@ class Activity:
         return "<Activity {}>".format(self.id)
 
     @classmethod
-    def fetch_all(cls):
-        return [cls(**activity) for activity in Connectwise.submit_request('sales/activities')]
+    def fetch_all(cls, fields=None, compact=False, lazy=False):
+        return [record_class(cls, compact, lazy)(**activity) for activity in Connectwise.submit_request('sales/activities', fields=fields)]
 
     @classmethod
-    def fetch_by_company_id(cls, company_id):
+    def fetch_by_company_id(cls, company_id, fields=None, compact=False, lazy=False):
         conditions = 'company/id={}'.format(company_id)
-        return [cls(**activity) for activity in Connectwise.submit_request('sales/activities', conditions)]
+        return [record_class(cls, compact, lazy)(**activity) for activity in Connectwise.submit_request('sales/activities', conditions, fields=fields)]
+
+    @classmethod
+    def fetch_by_id(cls, _id, fields=None, compact=False, lazy=False):
+        return [record_class(cls, compact, lazy)(**activity) for activity in Connectwise.fetch_record('sales/activities', _id, fields=fields)][0]
 
     @classmethod
-    def fetch_by_id(cls, _id):
-        conditions = 'id={}'.format(_id)
-        return [cls(**activity) for activity in Connectwise.submit_request('sales/activities', conditions)][0]
+    async def fetch_by_id_async(cls, client, _id, fields=None, compact=False, lazy=False):
+        conditions = Connectwise.condition('id', _id)
+        return [record_class(cls, compact, lazy)(**activity) for activity in await client.submit_request('sales/activities', conditions, fields=fields)][0]
 
     @classmethod
-    def fetch_by_date_range(cls, on_or_after=None, before=None):
+    def fetch_by_date_range(cls, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
         conditions = []
         if on_or_after: conditions.append('dateStart>=[{}]'.format(on_or_after))
         if before: conditions.append('dateStart<[{}]'.format(before))
-        return [cls(**activity) for activity in Connectwise.submit_request('sales/activities', conditions)]
+        return [record_class(cls, compact, lazy)(**activity) for activity in Connectwise.submit_request('sales/activities', conditions, fields=fields)]
@@ -15,9 +15,9 @@ class Agreement:
         return "<Agreement {}>".format(self.name)
 
     @classmethod
-    def fetch_vacation_agreements(cls):
+    def fetch_vacation_agreements(cls, fields=None):
         conditions = 'company/id = {} and type/name contains "vacation" and cancelledFlag = false'\
             .format(constants.CW_INTERNAL_COMPANY_ID)
         filters = {'orderBy': 'startDate desc'}
         return [Agreement(**agreement) for agreement in
-                Connectwise.submit_request('finance/agreements', conditions, filters)]
+                Connectwise.submit_request('finance/agreements', conditions, filters, fields=fields)]
@@ -0,0 +1,136 @@
+import asyncio
+
+import aiohttp
+import constants
+from .connectwise import Connectwise, ConnectwiseError
+from .decoding import loads
+from .fields import fields_to_str
+
+
+class AsyncConnectwise:
+    """
+    asyncio counterpart of Connectwise.submit_request. One instance owns one aiohttp connection pool,
+    so create it once and share it between coroutines:
+
+        async with AsyncConnectwise() as cw:
+            tickets = await asyncio.gather(*[Ticket.fetch_by_id_async(cw, _id) for _id in ticket_ids])
+
+    base_url defaults to https://CW_SERVER; point it at a local server to test without Connectwise.
+    """
+
+    def __init__(self, base_url=None, headers=None, concurrency=None, limit=None, limit_per_host=None,
+                 timeout=None):
+        """
+        :param base_url: scheme and host to send requests to, e.g. 'http://127.0.0.1:8080'
+        :param headers: defaults to constants.CW_HEADERS
+        :param concurrency: maximum number of requests in flight at once
+        :param limit: maximum number of open connections in the pool
+        :param limit_per_host: maximum number of open connections per host
+        :param timeout: total timeout in seconds for each request. Connect and read timeouts
+        follow Connectwise.session_options
+        """
+        self.base_url = base_url or 'https://{}'.format(constants.CW_SERVER)
+        self.headers = headers if headers is not None else constants.CW_HEADERS
+        self.concurrency = concurrency or getattr(constants, 'CW_ASYNC_CONCURRENCY', 20)
+        self.limit = limit or Connectwise.session_options['pool_maxsize']
+        self.limit_per_host = limit_per_host or 0
+        self.timeout = timeout if timeout is not None else Connectwise.session_options['timeout']
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self.get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            timeout = aiohttp.ClientTimeout(total=self.timeout,
+                                            connect=Connectwise.session_options['connect_timeout'],
+                                            sock_read=Connectwise.session_options['read_timeout'])
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=timeout)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def submit_request(self, endpoint, conditions='', filters=None, verb='GET', child_conditions='',
+                             fields=None):
+        if conditions or conditions == []:
+            if 'search' in endpoint or verb != 'POST': conditions = Connectwise.conditions_to_str(conditions)
+        if verb == 'GET':
+            return await self._submit_get_request(endpoint, conditions, filters, child_conditions, fields)
+        elif verb == 'POST':
+            return await self._submit_post_request(endpoint, conditions, fields)
+
+    async def _submit_post_request(self, endpoint, conditions, fields=None):
+        kwargs = {}
+        if 'search' in endpoint:
+            conditions = {'conditions': conditions}
+            fields = fields_to_str(endpoint.replace('/search', ''), fields)
+            if fields: kwargs['params'] = {'fields': fields}
+        url = '{}{}{}'.format(self.base_url, constants.CW_QUERY_URL, endpoint)
+        data, links = await self._send('POST', url, conditions, json=conditions, **kwargs)
+        return data
+
+    async def _submit_get_request(self, endpoint, conditions, filters=None, child_conditions='', fields=None):
+        filters = dict(filters) if filters else {}
+        filters.setdefault('page', 1)
+        filters.setdefault('pageSize', 1000)
+
+        url = '{}{}'.format(self.base_url, Connectwise._get_filters_string(endpoint, conditions, filters,
+                                                                          child_conditions, fields))
+        json_data = []
+        while url:
+            data, links = await self._send('GET', url, conditions)
+            if 'system/reports/' in endpoint or 'system/documents/count' == endpoint:
+                json_data.extend(Connectwise._system_report_to_dict(data))
+            else:
+                json_data.extend(data)
+
+            url = str(links['next']['url']).replace('https://na.', 'https://api-na.', 1) if 'next' in links else None
+        return json_data
+
+    async def _send(self, method, url, conditions, **kwargs):
+        """Send one request, sharing Connectwise.rate_limiter and Connectwise.retry_policy with the sync client"""
+        session = self.get_session()
+        retry_policy = Connectwise.retry_policy
+        rate_limiter = Connectwise.rate_limiter
+        attempt = 0
+        while True:
+            if rate_limiter: await asyncio.sleep(rate_limiter.reserve())
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, **kwargs) as r:
+                        status, reason, retry_after = r.status, r.reason, r.headers.get('Retry-After')
+                        body = await r.read()
+                        links = r.links
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not retry_policy or not retry_policy.should_retry(method, attempt):
+                    raise
+                await asyncio.sleep(retry_policy.backoff(attempt))
+                attempt += 1
+                continue
+
+            if status == 429 and rate_limiter:
+                rate_limiter.throttled()
+            elif status in (200, 201) and rate_limiter:
+                rate_limiter.succeeded()
+
+            if status in (200, 201):
+                return loads(body), links
+            if not retry_policy or not retry_policy.should_retry(method, attempt, status):
+                try:
+                    message = loads(body)['message']
+                except (ValueError, KeyError, TypeError):
+                    message = ''
+                raise ConnectwiseError('\n{}\n{}\n{}\n{}'.format('{} {}'.format(status, reason), url, conditions,
+                                                                 message), status)
+            await asyncio.sleep(retry_policy.backoff(attempt, retry_after))
+            attempt += 1
@@ -0,0 +1,148 @@
+from .activity import Activity
+from .loader import BatchLoader
+from .ticket import Ticket
+
+
+class ChargeToResolver:
+    """
+    Works out what Time, Expense and Schedule Entries are charged to, looking Tickets and Activities
+    up by id instead of scanning lists. Tickets and Activities that were not supplied are fetched in
+    batches the first time they are needed and kept for later lookups. Batches go through BatchLoader,
+    so anything already in Connectwise.cache is not fetched again.
+
+        resolver = ChargeToResolver(tickets, activities)
+        charge_to = resolver.resolve(time_entries + expense_entries, include_company=False)
+    """
+
+    def __init__(self, tickets=[], activities=[], fetch_missing=True):
+        """
+        :param tickets: Tickets already fetched
+        :param activities: Activities already fetched
+        :param fetch_missing: when False, an entry whose Ticket or Activity was not supplied is described
+        by its charge to type and id instead of fetching it
+        """
+        self.tickets = {}
+        self.activities = {}
+        self.fetch_missing = fetch_missing
+        self.add_tickets(tickets)
+        self.add_activities(activities)
+
+    def __repr__(self):
+        return "<Charge To Resolver {} tickets, {} activities>".format(len(self.tickets), len(self.activities))
+
+    def add_tickets(self, tickets):
+        for ticket in tickets:
+            self.tickets.setdefault(ticket.id, ticket)
+
+    def add_activities(self, activities):
+        for activity in activities:
+            self.activities.setdefault(activity.id, activity)
+
+    def prefetch(self, entries):
+        """Fetch every Ticket and Activity entries are charged to that is not known yet, in as few requests as possible"""
+        if not self.fetch_missing:
+            return
+        ticket_ids, activity_ids, object_ids = set(), set(), set()
+        for entry in entries:
+            if hasattr(entry, 'chargeToId'):
+                if entry.chargeToType in ('ServiceTicket', 'ProjectTicket'):
+                    ticket_ids.add(entry.chargeToId)
+                elif entry.chargeToType == 'Activity':
+                    activity_ids.add(entry.chargeToId)
+            elif hasattr(entry, 'objectId'):
+                object_ids.add(entry.objectId)
+        self._fetch_tickets((ticket_ids | object_ids) - set(self.tickets))
+        # schedule entries do not say what their objectId is, so whatever is not a ticket may be an activity
+        activity_ids |= {_id for _id in object_ids if self.tickets.get(_id) is None}
+        self._fetch_activities(activity_ids - set(self.activities))
+
+    def _fetch_tickets(self, ids):
+        ids = sorted(_id for _id in ids if _id is not None)
+        if ids:
+            self.tickets.update(zip(ids, BatchLoader('service/tickets', Ticket).load_many(ids)))
+
+    def _fetch_activities(self, ids):
+        ids = sorted(_id for _id in ids if _id is not None)
+        if ids:
+            self.activities.update(zip(ids, BatchLoader('sales/activities', Activity).load_many(ids)))
+
+    def ticket(self, _id):
+        """The Ticket with this id, or None if there isn't one"""
+        if _id not in self.tickets:
+            if not self.fetch_missing:
+                return None
+            self._fetch_tickets([_id])
+        return self.tickets[_id]
+
+    def activity(self, _id):
+        """The Activity with this id, or None if there isn't one"""
+        if _id not in self.activities:
+            if not self.fetch_missing:
+                return None
+            self._fetch_activities([_id])
+        return self.activities[_id]
+
+    def charge_to(self, cw_object):
+        """
+        :return: tuple of charge to id, charge to type, company name and the Ticket or Activity it is
+        charged to (None for anything else)
+        """
+        if hasattr(cw_object, 'chargeToId'):
+            charge_to_id = cw_object.chargeToId
+            charge_to_type = cw_object.chargeToType
+            company_name = cw_object.company['name']
+            if charge_to_type == 'Activity':
+                return charge_to_id, charge_to_type, company_name, self.activity(charge_to_id)
+            if charge_to_type in ('ProjectTicket', 'ServiceTicket'):
+                return charge_to_id, charge_to_type, company_name, self.ticket(charge_to_id)
+            return charge_to_id, charge_to_type, company_name, None
+
+        if hasattr(cw_object, 'objectId'):
+            charge_to_id = cw_object.objectId
+            ticket = self.ticket(charge_to_id)
+            if ticket:
+                return charge_to_id, ticket.recordType, ticket.company['name'], ticket
+            activity = self.activity(charge_to_id)
+            if activity:
+                return charge_to_id, 'Activity', activity.company['name'], activity
+            return charge_to_id, 'Charge Code', 'CEC', None
+
+        return None, None, None, None
+
+    def info(self, cw_object, return_type='string', include_company=True, include_project_name=True,
+             include_phase=True, bold_first_item=False):
+        """The charge to info of one entry, see Connectwise.get_charge_to_info"""
+        charge_to_id, charge_to_type, company_name, charged_to = self.charge_to(cw_object)
+
+        if charge_to_type == 'Activity' and charged_to:
+            output = []
+            if hasattr(charged_to, 'opportunity'): output.append('{}'.format(charged_to.opportunity['name']))
+            output.append('Activity #{}: {}'.format(charged_to.id, charged_to.name))
+
+        elif (charge_to_type == 'ProjectTicket' or charge_to_type == 'ServiceTicket') and charged_to:
+            output = []
+            if include_project_name and charged_to.project: output.append('{}'.format(charged_to.project['name']))
+            if include_phase and charged_to.phase: output.append('{}'.format(charged_to.phase['name']))
+            output.append('Ticket #{}: {}'.format(charged_to.id, charged_to.summary))
+
+        else:
+            output = [charge_to_type, '{}'.format(charge_to_id)]
+
+        if include_company:
+            output.insert(0, company_name)
+
+        if bold_first_item:
+            first_item = output.pop(0)
+            output.insert(0, '<strong>{}</strong>'.format(first_item))
+
+        if return_type == 'string':
+            return ' / '.join(output)
+        return output
+
+    def resolve(self, cw_objects, **options):
+        """
+        Charge to info for a whole list of Time, Expense and/or Schedule Entries, in the same order,
+        fetching whatever is missing up front. Takes the same options as info.
+        """
+        self.prefetch(cw_objects)
+        return [self.info(cw_object, **options) for cw_object in cw_objects]
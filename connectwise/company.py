@@ -4,7 +4,10 @@ from lib.connectwise_py.connectwise.contact import Contact
 from lib.connectwise_py.connectwise.schedule import ScheduleEntry
 from lib.connectwise_py.connectwise.time_entry import TimeEntry
 from lib.connectwise_py.connectwise.invoice import Invoice
+from lib.connectwise_py.connectwise.expense import ExpenseEntry
 from .connectwise import Connectwise
+from .partition import PartitionedStore
+from .timeline import Timeline
 
 
 class Company:
@@ -32,19 +35,23 @@ class Company:
         return [cls(**company) for company in Connectwise.submit_request('company/companies', fields=fields)]
 
     @classmethod
-    def fetch_by_state(cls, state):
+    def fetch_by_state(cls, state, fields=None):
         conditions = 'state="{}"'.format(state)
-        return [cls(**company) for company in Connectwise.submit_request('company/companies', conditions)]
+        return [cls(**company) for company in Connectwise.submit_request('company/companies', conditions, fields=fields)]
 
     @classmethod
-    def fetch_all_active(cls):
+    def fetch_all_active(cls, fields=None):
         conditions = 'status/id=1'
-        return [cls(**company) for company in Connectwise.submit_request('company/companies', conditions)]
+        return [cls(**company) for company in Connectwise.submit_request('company/companies', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_id(cls, _id):
-        conditions = 'id={}'.format(_id)
-        return [cls(**company) for company in Connectwise.submit_request('company/companies', conditions)][0]
+    def fetch_by_id(cls, _id, fields=None):
+        return [cls(**company) for company in Connectwise.fetch_record('company/companies', _id, fields=fields)][0]
+
+    @classmethod
+    async def fetch_by_id_async(cls, client, _id, fields=None):
+        conditions = Connectwise.condition('id', _id)
+        return [cls(**company) for company in await client.submit_request('company/companies', conditions, fields=fields)][0]
 
     def fetch_active_contacts(self):
         conditions = 'inactiveFlag=false'
@@ -62,7 +69,10 @@ class Company:
         return self.phoneNumber
 
     def fetch_time_this_quarter(self, time_entries=None):
+        """:param time_entries: a list of Time Entries or a PartitionedStore"""
         first_day_of_quarter = '2017-04-01T00:00:00Z'
+        if isinstance(time_entries, PartitionedStore):
+            return time_entries.time_entries(self.id)
         if not time_entries:
             return TimeEntry.fetch_by_company_id(self.id, first_day_of_quarter)
         else:
@@ -84,55 +94,14 @@ class Company:
         schedule_entries = self.fetch_schedule_entries(on_or_after, before)
         time_entries = self.fetch_time_entries(on_or_after, before)
 
-        oldest_schedule_date = datetime.strptime(sorted(schedule_entries, key=lambda x: x.dateStart)[0].dateStart[:10], '%Y-%m-%d')
-        oldest_time_date = datetime.strptime(sorted(time_entries, key=lambda x: x.timeStart)[0].timeStart[:10], '%Y-%m-%d')
-        oldest_date = oldest_schedule_date if oldest_schedule_date < oldest_time_date else oldest_time_date
-
-        schedule_and_time = []
-        while oldest_date < datetime.today():
-            this_days_schedule_entries = [schedule_entry for schedule_entry in schedule_entries if datetime.strptime(schedule_entry.dateStart[:10], '%Y-%m-%d') == oldest_date]
-            this_days_time_entries = [time_entry for time_entry in time_entries if datetime.strptime(time_entry.timeStart[:10], '%Y-%m-%d') == oldest_date]
-
-            # print(oldest_date)
-            # print(this_days_schedule_entries)
-            # print(this_days_time_entries)
-            # print('--')
-            this_days_members = []
-            if by == 'member':
-                if this_days_time_entries:
-                    this_days_members.extend([time_entry.member['identifier'] for time_entry in this_days_time_entries])
-                if this_days_schedule_entries:
-                    this_days_members.extend([schedule_entry.member['identifier'] for schedule_entry in this_days_schedule_entries])
-                this_days_members = set(this_days_members)
-
-                member_schedule_and_time = []
-                if this_days_members:
-                    for member_identifier in this_days_members:
-                        member_schedule_and_time.append({
-                            'member_identifier': member_identifier,
-                            'schedule_entries': [schedule_entry for schedule_entry in this_days_schedule_entries if
-                                                 schedule_entry.member['identifier'] == member_identifier],
-                            'time_entries': [time_entry for time_entry in this_days_time_entries if
-                                                 time_entry.member['identifier'] == member_identifier]
-                        })
-
-                    schedule_and_time.append({
-                        'date': oldest_date,
-                        'members': member_schedule_and_time
-                    })
-            else:
-                if this_days_schedule_entries or this_days_time_entries:
-                    schedule_and_time.append({
-                        'date': oldest_date,
-                        'schedule_entries': this_days_schedule_entries,
-                        'time_entries': this_days_time_entries
-                    })
-            oldest_date += timedelta(days=1)
-        # print(schedule_and_time)
-        return schedule_and_time
+        timeline = Timeline(schedule_entries=schedule_entries, time_entries=time_entries)
+        return timeline.days(by='member' if by == 'member' else None, until=datetime.today().strftime('%Y-%m-%d'))
 
     def fetch_invoices(self, invoices=None, on_or_after=None, before=None):
-        if invoices:
+        """:param invoices: a list of Invoices or a PartitionedStore"""
+        if isinstance(invoices, PartitionedStore):
+            self.invoices = invoices.invoices(self.id, on_or_after, before)
+        elif invoices:
             self.invoices = [i for i in invoices if i.company['id'] == self.id and on_or_after <= i.date[:10] < before]
         else:
             self.invoices = Invoice.fetch_by_company(self.id, on_or_after, before)
@@ -143,7 +112,10 @@ class Company:
         return sum([i.total for i in invoices])
 
     def fetch_time_entries_by_date_range(self, time_entries=[], on_or_after=None, before=None):
-        if time_entries:
+        """:param time_entries: a list of Time Entries or a PartitionedStore"""
+        if isinstance(time_entries, PartitionedStore):
+            self.time_entries = time_entries.time_entries(self.id, on_or_after, before)
+        elif time_entries:
             self.time_entries = [t for t in time_entries if t.company['id'] == self.id and on_or_after <= t.timeStart[:10] < before]
         else:
             self.time_entries = TimeEntry.fetch_by_company_id(self.id, on_or_after, before)
@@ -152,3 +124,14 @@ class Company:
     def fetch_actual_days_by_date_range(self, time_entries=[], on_or_after=None, before=None):
         time_entries = self.fetch_time_entries_by_date_range(time_entries, on_or_after, before)
         return sum([t.actual_days() for t in time_entries])
+
+    def fetch_expense_entries_by_date_range(self, expense_entries=[], on_or_after=None, before=None):
+        """:param expense_entries: a list of Expense Entries or a PartitionedStore"""
+        if isinstance(expense_entries, PartitionedStore):
+            self.expense_entries = expense_entries.expense_entries(self.id, on_or_after, before)
+        elif expense_entries:
+            self.expense_entries = [e for e in expense_entries
+                                    if e.company['id'] == self.id and on_or_after <= e.date[:10] < before]
+        else:
+            self.expense_entries = ExpenseEntry.fetch_by_company_id(self.id, on_or_after, before)
+        return self.expense_entries
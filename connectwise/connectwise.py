@@ -1,53 +1,373 @@
+import copy
 import json
+import math
+import threading
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta
 import requests
 from dateutil.relativedelta import relativedelta
+from requests.adapters import HTTPAdapter
 import constants
+from .cache import TTLCache
+from .deadline import Deadline, DeadlineExceeded
+from .decoding import iter_records, loads
+from .fields import fields_to_str
+from .identity import IdentityMap
+from .mirror import UnsupportedQuery
+from .retry import RetryPolicy, TokenBucket
+
+
+class ConnectwiseError(RuntimeError):
+    """
+    Raised when Connectwise answers with an error status after all retries are used up.
+    For paginated GET requests, `page` is the page that failed, so a long fetch can be resumed with
+    filters={'page': e.page} instead of starting over.
+    """
+
+    def __init__(self, message, status_code=None, page=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.page = page
 
 
 class Connectwise:
+    _session = None
+    session_options = {
+        'pool_connections': getattr(constants, 'CW_POOL_CONNECTIONS', 4),
+        'pool_maxsize': getattr(constants, 'CW_POOL_MAXSIZE', 10),
+        'pool_block': getattr(constants, 'CW_POOL_BLOCK', False),
+        'keep_alive': getattr(constants, 'CW_KEEP_ALIVE', True),
+        'timeout': getattr(constants, 'CW_TIMEOUT', None),
+        'connect_timeout': getattr(constants, 'CW_CONNECT_TIMEOUT', 10),
+        'read_timeout': getattr(constants, 'CW_READ_TIMEOUT', 120),
+    }
+    max_workers = getattr(constants, 'CW_MAX_WORKERS', 4)
+    incremental_parsing = getattr(constants, 'CW_INCREMENTAL_PARSING', False)
+    _local = threading.local()
+    mirror = None  # set to a SQLiteMirror to answer GET requests locally while it is fresh
+    max_conditions_length = getattr(constants, 'CW_MAX_CONDITIONS_LENGTH', 1500)
+    cache = TTLCache(getattr(constants, 'CW_CACHE_SIZE', 10000), getattr(constants, 'CW_CACHE_TTL', 300))
+    retry_policy = RetryPolicy(max_retries=getattr(constants, 'CW_MAX_RETRIES', 5))
+    rate_limiter = TokenBucket(getattr(constants, 'CW_RATE_LIMIT', 20))  # set to None to disable
+
+    @classmethod
+    def configure_session(cls, **options):
+        """
+        Change the connection pool settings used for every request to Connectwise.
+        The current session is closed and a new one is built on next use.
+        :param pool_connections: number of per-host connection pools to cache
+        :param pool_maxsize: maximum number of connections kept open per host
+        :param pool_block: when True, wait for a free connection instead of opening extra ones
+        :param keep_alive: when False, send 'Connection: close' so sockets are not reused
+        :param timeout: overall timeout in seconds; when set it replaces connect_timeout and read_timeout
+        :param connect_timeout: seconds to wait for a connection to be established
+        :param read_timeout: seconds to wait between bytes received from the server
+        """
+        unknown = set(options) - set(cls.session_options)
+        if unknown:
+            raise ValueError('Unknown session options: {}'.format(', '.join(sorted(unknown))))
+        cls.session_options.update(options)
+        cls.close_session()
+
+    @classmethod
+    def get_session(cls):
+        if cls._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=cls.session_options['pool_connections'],
+                                  pool_maxsize=cls.session_options['pool_maxsize'],
+                                  pool_block=cls.session_options['pool_block'])
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            if not cls.session_options['keep_alive']:
+                session.headers['Connection'] = 'close'
+            cls._session = session
+        return cls._session
+
+    @classmethod
+    def close_session(cls):
+        if cls._session is not None:
+            cls._session.close()
+            cls._session = None
+
+    @classmethod
+    @contextmanager
+    def deadline(cls, seconds):
+        """
+        Give every request made inside the block a shared time budget, including every page of
+        a paginated fetch and every query of methods like ScheduleEntry.fetch_by_company_id.
+        Raises DeadlineExceeded as soon as the budget is spent. A nested deadline can only shorten
+        the budget of the enclosing one. seconds=None is a no-op.
+        """
+        outer = cls.current_deadline()
+        if seconds is None or (outer and outer.remaining() <= seconds):
+            yield outer
+            return
+        cls._local.deadline = Deadline(seconds)
+        try:
+            yield cls._local.deadline
+        finally:
+            cls._local.deadline = outer
+
+    @classmethod
+    def current_deadline(cls):
+        return getattr(cls._local, 'deadline', None)
+
+    @classmethod
+    @contextmanager
+    def identity_map(cls, identities=None):
+        """
+        Share nested references such as company and member between every record fetched inside the block,
+        see IdentityMap. Pass an IdentityMap to keep using one across blocks.
+        """
+        outer = cls.current_identity_map()
+        cls._local.identity_map = identities if identities is not None else IdentityMap()
+        try:
+            yield cls._local.identity_map
+        finally:
+            cls._local.identity_map = outer
+
+    @classmethod
+    def current_identity_map(cls):
+        return getattr(cls._local, 'identity_map', None)
+
+    @classmethod
+    def _intern(cls, records):
+        identities = cls.current_identity_map()
+        return identities.intern_all(records) if identities is not None else records
 
     @classmethod
-    def submit_request(cls, endpoint, conditions='', filters=None, verb='GET', child_conditions='', fields=None):
+    def _timeout(cls):
+        if cls.session_options['timeout'] is not None:
+            return cls.session_options['timeout']
+        return cls.session_options['connect_timeout'], cls.session_options['read_timeout']
+
+    @classmethod
+    def _sleep(cls, seconds, deadline):
+        if deadline and deadline.remaining() < seconds:
+            raise DeadlineExceeded('Deadline of {}s exceeded while backing off'.format(deadline.seconds))
+        time.sleep(seconds)
+
+    @classmethod
+    def _send(cls, method, url, deadline=None, **kwargs):
+        """
+        Send one request through the shared session, waiting on the rate limiter first and retrying
+        throttled (429), failed (5xx) or dropped requests according to Connectwise.retry_policy.
+        deadline defaults to the one set by Connectwise.deadline() in the calling thread.
+        """
+        deadline = deadline or cls.current_deadline()
+        kwargs.setdefault('headers', constants.CW_HEADERS)
+        timeout = kwargs.pop('timeout', cls._timeout())
+        attempt = 0
+        while True:
+            if cls.rate_limiter: cls._sleep(cls.rate_limiter.reserve(), deadline)
+            try:
+                r = cls.get_session().request(method, url, timeout=deadline.clamp(timeout) if deadline else timeout,
+                                              **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if deadline: deadline.check()
+                if not cls.retry_policy or not cls.retry_policy.should_retry(method, attempt):
+                    raise
+                cls._sleep(cls.retry_policy.backoff(attempt), deadline)
+                attempt += 1
+                continue
+
+            if r.status_code == 429 and cls.rate_limiter:
+                cls.rate_limiter.throttled()
+            elif r.ok and cls.rate_limiter:
+                cls.rate_limiter.succeeded()
+
+            if r.ok or not cls.retry_policy or not cls.retry_policy.should_retry(method, attempt, r.status_code):
+                return r
+            r.close()
+            cls._sleep(cls.retry_policy.backoff(attempt, r.headers.get('Retry-After')), deadline)
+            attempt += 1
+
+    @classmethod
+    def submit_request(cls, endpoint, conditions='', filters=None, verb='GET', child_conditions='', fields=None,
+                       parallel=False):
+        """
+        Submit a request to the Connectwise API and return the decoded records.
+        :param parallel: for paginated GET requests, ask the endpoint's /count for the number of
+        records first and fetch every page concurrently. Pass an int to override Connectwise.max_workers
+        """
         if conditions or conditions == []:
             if 'search' in endpoint or verb != 'POST': conditions = cls.conditions_to_str(conditions)
         if verb == 'GET':
-            return cls.__cw_submit_get_request(endpoint, conditions, filters, child_conditions, fields)
+            mirrored = cls.__query_mirror(endpoint, conditions, filters, child_conditions, fields)
+            if mirrored is not None:
+                return cls._intern(mirrored)
+            if parallel and not endpoint.startswith('system/reports/') and endpoint != 'system/documents/count':
+                max_workers = cls.max_workers if parallel is True else parallel
+                return cls._intern(cls.__cw_submit_parallel_get_request(endpoint, conditions, filters,
+                                                                        child_conditions, fields, max_workers))
+            return cls._intern(cls.__cw_submit_get_request(endpoint, conditions, filters, child_conditions, fields))
         elif verb == 'POST':
-            return cls.__cw_submit_post_request(endpoint, conditions)
+            json_data = cls.__cw_submit_post_request(endpoint, conditions, fields)
+            return cls._intern(json_data) if isinstance(json_data, list) else json_data
+
+    @classmethod
+    def submit_chunked_request(cls, endpoint, key, values, conditions='', fields=None, unique_key='id',
+                               max_workers=None, max_length=None):
+        """
+        Fetch the records of endpoint whose key is any of values, for any number of values.
+        values are split into as few '(key=a or key=b ...)' queries as fit under max_length, each combined
+        with conditions, and the queries run concurrently. Results keep query order and are deduplicated
+        on unique_key (set to None to keep duplicates).
+        """
+        conditions = cls.conditions_to_str(conditions) if conditions else ''
+        fields = fields_to_str(endpoint, fields)
+        if fields and unique_key and unique_key not in fields.split(','):
+            fields += ',' + unique_key
+        max_length = (max_length or cls.max_conditions_length) - len(urllib.parse.quote_plus(conditions + ' and '))
+        values = list(dict.fromkeys(values))
+        if not values:
+            return []
+        queries = ['{} and {}'.format(conditions, chunk) if conditions else chunk
+                   for chunk in cls.chunk_conditions(key, values, max_length)]
+        deadline = cls.current_deadline()
+
+        def fetch_chunk(chunk_conditions):
+            with cls.deadline(deadline.remaining() if deadline else None):
+                return cls.submit_request(endpoint, chunk_conditions, fields=fields)
+
+        json_data = []
+        seen = set()
+        with ThreadPoolExecutor(max_workers=max_workers or cls.max_workers) as executor:
+            for records in executor.map(fetch_chunk, queries):
+                for record in records:
+                    if unique_key:
+                        if record[unique_key] in seen:
+                            continue
+                        seen.add(record[unique_key])
+                    json_data.append(record)
+        return cls._intern(json_data)
+
+    @classmethod
+    def fetch_record(cls, endpoint, value, key='id', fields=None):
+        """
+        Fetch the records of endpoint whose key equals value, reading through Connectwise.cache.
+        Returns a list of 0 or 1 raw records, just like submit_request would. Misses are cached too.
+        Set Connectwise.cache to None to always hit the API.
+        """
+        fields = fields_to_str(endpoint, fields)
+        records = cls.cached_records(endpoint, key, value, fields)
+        if records is None:
+            records = cls.submit_request(endpoint, cls.condition(key, value), fields=fields)
+            cls.cache_records(endpoint, key, value, records, fields)
+        # model constructors keep references to nested dicts, so never hand out the cached ones
+        return cls._intern(copy.deepcopy(records))
 
     @staticmethod
-    def update_record(endpoint, record_id, path, value, operation='replace'):
+    def _cache_key(endpoint, key, value):
+        """One cache entry per record, whatever type value is given as, so 123 and '123' share it"""
+        return endpoint, key, '{}'.format(value).lower()
+
+    @classmethod
+    def cached_records(cls, endpoint, key, value, fields=None):
+        """The records cached for endpoint's key equal to value, fetched with fields, or None if there are none"""
+        if cls.cache is None:
+            return None
+        projections = cls.cache.get(cls._cache_key(endpoint, key, value), None)
+        return projections.get(fields) if projections else None
+
+    @classmethod
+    def cache_records(cls, endpoint, key, value, records, fields=None):
+        """
+        Cache the records of endpoint's key equal to value, fetched with fields. Every projection of a
+        record is kept in the same cache entry, so evict_record drops them all at once. Projections added
+        to an existing entry expire with it.
+        """
+        if cls.cache is None:
+            return
+        cache_key = cls._cache_key(endpoint, key, value)
+        projections = cls.cache.get(cache_key, None)
+        if projections is None:
+            cls.cache.set(cache_key, {fields: records})
+        else:
+            projections[fields] = records
+
+    @classmethod
+    def evict_record(cls, endpoint, key, value):
+        """Drop every cached projection of endpoint's key equal to value"""
+        if cls.cache is not None: cls.cache.delete(cls._cache_key(endpoint, key, value))
+
+    @classmethod
+    def iter_request(cls, endpoint, conditions='', filters=None, child_conditions='', fields=None):
+        """
+        Like submit_request for GET requests, but yield records one at a time as each page arrives
+        instead of accumulating every page into one list. With Connectwise.incremental_parsing set
+        (and ijson installed), records are decoded straight off the response stream.
+        """
+        if conditions or conditions == []:
+            conditions = cls.conditions_to_str(conditions)
+        mirrored = cls.__query_mirror(endpoint, conditions, filters, child_conditions, fields)
+        identities = cls.current_identity_map()
+        if mirrored is not None:
+            yield from identities.intern_all(mirrored) if identities is not None else mirrored
+            return
+        for page_data in cls.__cw_iter_get_pages(endpoint, conditions, filters, child_conditions, fields,
+                                                 stream=cls.incremental_parsing):
+            if identities is None:
+                yield from page_data
+            else:
+                for record in page_data:
+                    yield identities.intern(record)
+
+    @classmethod
+    def update_record(cls, endpoint, record_id, path, value, operation='replace'):
         conditions = json.dumps([{'op': operation, 'path': path, 'value': value}])
-        r = requests.patch(
+        cls.evict_record(endpoint, 'id', record_id)
+        r = cls._send(
+            'PATCH',
             'https://{}{}{}/{}'.format(constants.CW_SERVER, constants.CW_QUERY_URL, endpoint, record_id),
-            headers=constants.CW_HEADERS,
             data=conditions
         )
         if r.status_code == requests.codes.ok or r.ok == True or r.status_code == 201:
             return r.json()  # json_data.extend(r.json())
         else:
-            raise RuntimeError('\n{}\n{}\n{}\n{}'.format('{} {}'.format(r.status_code, r.reason), r.url, 'id: {}, op: {}, path: {}, value: {}'.format(record_id, operation, path, value), r.json()['message'] if hasattr(r, 'json') else ''))
+            raise ConnectwiseError('\n{}\n{}\n{}\n{}'.format('{} {}'.format(r.status_code, r.reason), r.url, 'id: {}, op: {}, path: {}, value: {}'.format(record_id, operation, path, value), r.json()['message'] if hasattr(r, 'json') else ''), r.status_code)
 
     @classmethod
-    def __cw_submit_post_request(cls, endpoint, conditions):
+    def __cw_submit_post_request(cls, endpoint, conditions, fields=None):
+        params = None
         if 'search' in endpoint:
             conditions = {'conditions': conditions}
+            fields = fields_to_str(endpoint.replace('/search', ''), fields)
+            if fields: params = {'fields': fields}
 
-        r = requests.post(
+        r = cls._send(
+            'POST',
             'https://{}{}{}'.format(constants.CW_SERVER, constants.CW_QUERY_URL, endpoint),
-            headers=constants.CW_HEADERS,
-            json=conditions
+            json=conditions,
+            params=params
         )
 
         if r.status_code == requests.codes.ok or r.ok == True or r.status_code == 201:
             return r.json()  # json_data.extend(r.json())
         else:
-            raise RuntimeError('\n{}\n{}\n{}\n{}'.format('{} {}'.format(r.status_code, r.reason), r.url, conditions, r.json()['message'] if hasattr(r, 'json') else ''))
+            raise ConnectwiseError('\n{}\n{}\n{}\n{}'.format('{} {}'.format(r.status_code, r.reason), r.url, conditions, r.json()['message'] if hasattr(r, 'json') else ''), r.status_code)
+
+    @classmethod
+    def __query_mirror(cls, endpoint, conditions, filters, child_conditions, fields):
+        if cls.mirror is None or child_conditions or not cls.mirror.is_fresh(endpoint):
+            return None
+        try:
+            return cls.mirror.query(endpoint, conditions, filters, fields)
+        except UnsupportedQuery:
+            return None
 
     @classmethod
     def __cw_submit_get_request(cls, endpoint, conditions, filters=None, child_conditions='', fields=None):
+        json_data = []
+        for page_data in cls.__cw_iter_get_pages(endpoint, conditions, filters, child_conditions, fields):
+            json_data.extend(page_data)
+        return json_data
+
+    @classmethod
+    def __cw_iter_get_pages(cls, endpoint, conditions, filters=None, child_conditions='', fields=None, stream=False):
         if filters is None:
             filters = {'page': 1, 'pageSize': 1000}
         if 'page' not in filters:
@@ -55,21 +375,21 @@ class Connectwise:
         if 'pageSize' not in filters:
             filters['pageSize'] = 1000
 
-        filters_string = cls.__get_filters_string(endpoint, conditions, filters, child_conditions, fields)
-        r = requests.get('https://{}{}'.format(constants.CW_SERVER, filters_string), headers=constants.CW_HEADERS)
+        filters_string = cls._get_filters_string(endpoint, conditions, filters, child_conditions, fields)
+        is_report = 'system/reports/' in endpoint or 'system/documents/count' == endpoint
+        stream = stream and not is_report
+        r = cls._send('GET', 'https://{}{}'.format(constants.CW_SERVER, filters_string), stream=stream)
 
-        json_data = []
-        page = 1
+        page = filters['page']
 
         while True:
-            if r.status_code == requests.codes.ok or r.ok == True or r.status_code == 201:
-                if 'system/reports/' in endpoint or 'system/documents/count' == endpoint:
-                    json_data.extend(cls.__system_report_to_dict(json.loads(r.text)))
-                else:
-                    json_data.extend(r.json())
+            cls.__raise_for_status(r, conditions, page)
+            if is_report:
+                yield cls._system_report_to_dict(loads(r.content))
+            elif stream:
+                yield iter_records(r)
             else:
-                raise RuntimeError('\n{}\n{}\n{}\n{}'.format('{} {}'.format(r.status_code, r.reason), r.url, conditions,
-                                                             r.json()['message'] if hasattr(r, 'json') else ''))
+                yield loads(r.content)
 
             try:
                 r.links['next']['url']
@@ -78,14 +398,53 @@ class Connectwise:
 
             page += 1
             filters['page'] = page
-            filters_string = cls.__get_filters_string(endpoint, conditions, filters, child_conditions, fields)
-            r = requests.get(r.links['next']['url'].replace('https://na.', 'https://api-na.', 1),
-                             headers=constants.CW_HEADERS)
+            filters_string = cls._get_filters_string(endpoint, conditions, filters, child_conditions, fields)
+            r = cls._send('GET', r.links['next']['url'].replace('https://na.', 'https://api-na.', 1), stream=stream)
+
+    @classmethod
+    def __cw_submit_parallel_get_request(cls, endpoint, conditions, filters=None, child_conditions='', fields=None,
+                                         max_workers=4):
+        filters = dict(filters) if filters else {}
+        first_page = filters.get('page', 1)
+        page_size = filters.get('pageSize', 1000)
+
+        count = cls.__cw_submit_count_request(endpoint, conditions, child_conditions)
+        last_page = max(math.ceil(count / page_size), first_page)
+        deadline = cls.current_deadline()  # thread-local, so hand it to the workers explicitly
+
+        def fetch_page(page):
+            page_filters = dict(filters, page=page, pageSize=page_size)
+            filters_string = cls._get_filters_string(endpoint, conditions, page_filters, child_conditions, fields)
+            r = cls._send('GET', 'https://{}{}'.format(constants.CW_SERVER, filters_string), deadline=deadline)
+            cls.__raise_for_status(r, conditions, page)
+            return loads(r.content)
 
+        json_data = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # executor.map yields results in page order regardless of completion order
+            for page_data in executor.map(fetch_page, range(first_page, last_page + 1)):
+                json_data.extend(page_data)
         return json_data
 
+    @classmethod
+    def __cw_submit_count_request(cls, endpoint, conditions, child_conditions=''):
+        filters_string = '{}{}/count?conditions={}'.format(constants.CW_QUERY_URL, endpoint,
+                                                          urllib.parse.quote_plus(conditions))
+        if child_conditions: filters_string += '&childconditions={}'.format(child_conditions)
+        r = cls._send('GET', 'https://{}{}'.format(constants.CW_SERVER, filters_string))
+        cls.__raise_for_status(r, conditions)
+        return loads(r.content)['count']
+
+    @staticmethod
+    def __raise_for_status(r, conditions, page=None):
+        if r.status_code == requests.codes.ok or r.ok == True or r.status_code == 201:
+            return
+        raise ConnectwiseError('\n{}\n{}\n{}\n{}'.format('{} {}'.format(r.status_code, r.reason), r.url, conditions,
+                                                         r.json()['message'] if hasattr(r, 'json') else ''),
+                               r.status_code, page)
+
     @staticmethod
-    def __system_report_to_dict(report_data):
+    def _system_report_to_dict(report_data):
         keys = [list(col.keys())[0] for col in report_data['column_definitions']]
 
         objects = []
@@ -98,7 +457,7 @@ class Connectwise:
         return objects
 
     @staticmethod
-    def __get_filters_string(endpoint, conditions, filters, child_conditions, fields):
+    def _get_filters_string(endpoint, conditions, filters, child_conditions, fields):
         if endpoint == 'system/documents/count':
             return '{}{}?{}'.format(constants.CW_QUERY_URL, endpoint, conditions)
 
@@ -107,6 +466,7 @@ class Connectwise:
 
         filters_string += '&page={}&pageSize={}'.format(filters['page'], filters['pageSize'])
         if child_conditions: filters_string += '&childconditions={}'.format(child_conditions)
+        fields = fields_to_str(endpoint, fields)
         if fields: filters_string += '&fields={}'.format(fields)
 
         if 'orderBy' in filters:
@@ -114,6 +474,35 @@ class Connectwise:
 
         return filters_string
 
+    @staticmethod
+    def condition(key, value):
+        if isinstance(value, str) and not value.isdigit():
+            return '{}="{}"'.format(key, value)
+        return '{}={}'.format(key, value)
+
+    @classmethod
+    def chunk_conditions(cls, key, values, max_length=None):
+        """
+        Split values into as few '(key=a or key=b ...)' condition strings as possible while keeping
+        each one, URL-encoded, under max_length characters (defaults to Connectwise.max_conditions_length)
+        """
+        max_length = max_length or cls.max_conditions_length
+        chunk = []
+        length = len(urllib.parse.quote_plus('()'))
+        separator_length = len(urllib.parse.quote_plus(' or '))
+        for value in values:
+            condition = cls.condition(key, value)
+            condition_length = len(urllib.parse.quote_plus(condition)) + (separator_length if chunk else 0)
+            if chunk and length + condition_length > max_length:
+                yield '({})'.format(' or '.join(chunk))
+                chunk = []
+                length = len(urllib.parse.quote_plus('()'))
+                condition_length -= separator_length
+            chunk.append(condition)
+            length += condition_length
+        if chunk:
+            yield '({})'.format(' or '.join(chunk))
+
     @staticmethod
     def conditions_to_str(conditions):
         if not isinstance(conditions, str):
@@ -224,85 +613,10 @@ class Connectwise:
     @staticmethod
     def get_charge_to_info(cw_object, tickets=[], activities=[], charge_codes=[], return_type='string', include_company=True, include_project_name=True, include_phase=True, bold_first_item=False):
         """cw_object can be Time Entry, Expense Entry, or Schedule Entry you want to get charge_to info for.
-        You can return a string or a dict using the return_type parameter"""
-
-        from lib.connectwise_py.connectwise.activity import Activity
-        from lib.connectwise_py.connectwise.ticket import Ticket
-
-        charge_to_id = None
-        charge_to_type = None
-        company_name = None
-
-        if hasattr(cw_object, 'chargeToId'):
-            charge_to_id = cw_object.chargeToId
-            charge_to_type = cw_object.chargeToType
-            company_name = cw_object.company['name']
-        elif hasattr(cw_object, 'objectId'):
-            charge_to_id = cw_object.objectId
-
-            ticket = []
-            if tickets: ticket = [ticket for ticket in tickets if ticket.id == charge_to_id]
-
-            if len(ticket) > 0: ticket = ticket[0]
-            else: ticket = Ticket.fetch_by_id(charge_to_id)
-
-            if ticket:
-                charge_to_type = ticket.recordType
-                company_name = ticket.company['name']
-            else:
-                activity = []
-                if activities: activity = [activity for activity in activities if activity.id == charge_to_id]
-
-                if len(activity) > 0: activity = activity[0]
-                else: activity = Activity.fetch_by_id(charge_to_id)
-
-                if activity:
-                    charge_to_type = 'Activity'
-                    company_name = activity.company['name']
-                else:
-                    charge_to_type = 'Charge Code'
-                    company_name = 'CEC'
-
-        if charge_to_type == 'Activity':
-            if activities:
-                activity = [activity for activity in activities if charge_to_id == activity.id]
-                if len(activity) > 0:
-                    activity = activity[0]
-                else:
-                    activity = Activity.fetch_by_id(charge_to_id)
-            else:
-                activity = Activity.fetch_by_id(charge_to_id)
-            output = []
-            if hasattr(activity, 'opportunity'): output.append('{}'.format(activity.opportunity['name']))
-            output.append('Activity #{}: {}'.format(activity.id, activity.name))
-
-        elif charge_to_type == 'ProjectTicket' or charge_to_type == 'ServiceTicket':
-            if tickets:
-                ticket = [ticket for ticket in tickets if charge_to_id == ticket.id]
-                if len(ticket) > 0:
-                    ticket = ticket[0]
-                else:
-                    ticket = Ticket.fetch_by_id(charge_to_id)
-            else:
-                ticket = Ticket.fetch_by_id(charge_to_id)
-            output = []
-            if include_project_name and ticket.project: output.append('{}'.format(ticket.project['name']))
-            if include_phase and ticket.phase: output.append('{}'.format(ticket.phase['name']))
-            output.append('Ticket #{}: {}'.format(ticket.id, ticket.summary))
-
-        else:
-            output = [charge_to_type, '{}'.format(charge_to_id)]
-
-        if include_company:
-            output.insert(0, company_name)
-
-        if bold_first_item:
-            first_item = output.pop(0)
-            output.insert(0, '<strong>{}</strong>'.format(first_item))
+        You can return a string or a dict using the return_type parameter.
+        To resolve many entries at once, use ChargeToResolver.resolve instead"""
 
-        if return_type == 'string':
-            return ' / '.join(output)
-        elif return_type == 'list':
-            return output
+        from lib.connectwise_py.connectwise.charge_to import ChargeToResolver
 
-        return output
+        return ChargeToResolver(tickets, activities).info(
+            cw_object, return_type, include_company, include_project_name, include_phase, bold_first_item)
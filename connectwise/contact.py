@@ -16,35 +16,34 @@ class Contact:
         return "<Contact {} {}>".format(self.id, self.get_email())
 
     @classmethod
-    def fetch_by_id(cls, _id):
-        conditions = 'id={}'.format(_id)
-        contacts = Connectwise.submit_request('company/contacts', conditions)
+    def fetch_by_id(cls, _id, fields=None):
+        contacts = Connectwise.fetch_record('company/contacts', _id, fields=fields)
         return [cls(**contact) for contact in contacts][0]
 
     @classmethod
-    def fetch_by_email(cls, email):
+    def fetch_by_email(cls, email, fields=None):
         child_conditions = 'communicationItems/value="{}"'.format(email)
-        contacts = Connectwise.submit_request('company/contacts', child_conditions=child_conditions)
+        contacts = Connectwise.submit_request('company/contacts', child_conditions=child_conditions, fields=fields)
         if len(contacts) > 0: contact = contacts[0]
         else: contact = None
         return cls(**contact)
 
     @classmethod
-    def fetch_all(cls):
-        return [cls(**contact) for contact in Connectwise.submit_request('company/contacts')]
+    def fetch_all(cls, fields=None):
+        return [cls(**contact) for contact in Connectwise.submit_request('company/contacts', fields=fields)]
 
     @classmethod
-    def fetch_all_internal(cls):
+    def fetch_all_internal(cls, fields=None):
         conditions = 'company/id={}'.format(constants.CW_INTERNAL_COMPANY_ID)
-        contacts = Connectwise.submit_request('company/contacts', conditions)
+        contacts = Connectwise.submit_request('company/contacts', conditions, fields=fields)
         return [cls(**contact) for contact in contacts]
 
     @classmethod
-    def fetch_by_company_id(cls, company_id, additional_conditions=None):
+    def fetch_by_company_id(cls, company_id, additional_conditions=None, fields=None):
         conditions = 'company/id={}'.format(company_id)
         if additional_conditions:
             conditions += ' and {}'.format(additional_conditions)
-        contacts = Connectwise.submit_request('company/contacts', conditions)
+        contacts = Connectwise.submit_request('company/contacts', conditions, fields=fields)
         return [cls(**contact) for contact in contacts]
 
     def get_phone(self, i=0):
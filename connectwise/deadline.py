@@ -0,0 +1,39 @@
+import time
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """
+    A time budget shared by every request made while it is active, so that a multi-page fetch
+    or a method issuing several queries fails fast once the budget is spent.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def __repr__(self):
+        return "<Deadline {:.2f}s remaining>".format(self.remaining())
+
+    def remaining(self):
+        return max(self.expires - time.monotonic(), 0)
+
+    def expired(self):
+        return time.monotonic() >= self.expires
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded('Deadline of {}s exceeded'.format(self.seconds))
+
+    def clamp(self, timeout):
+        """Shrink a requests timeout (a number or a (connect, read) tuple) to fit the remaining budget"""
+        self.check()
+        remaining = self.remaining()
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+        return min(timeout, remaining)
@@ -0,0 +1,37 @@
+"""
+JSON decoding for API responses. orjson is used when it is installed, and ijson makes
+incremental parsing possible, where records are decoded straight from the response byte stream
+one at a time instead of from a fully materialized text copy of the page.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def loads(data):
+    """Decode bytes or str with the fastest available backend"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_records(response):
+    """
+    Yield the records of a JSON array response. Parses incrementally from response.raw when ijson
+    is installed and the response was requested with stream=True, otherwise decodes the whole body.
+    """
+    try:
+        if ijson is not None and not response._content_consumed:
+            response.raw.decode_content = True
+            yield from ijson.items(response.raw, 'item', use_float=True)
+        else:
+            yield from loads(response.content)
+    finally:
+        response.close()
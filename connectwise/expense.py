@@ -4,9 +4,18 @@ from pprint import pprint
 from lib.connectwise_py.connectwise.activity import Activity
 from lib.connectwise_py.connectwise.ticket import Ticket
 from .connectwise import Connectwise
+from .records import record_class
 
 
 class ExpenseEntry:
+    RECORD_FIELDS = (
+        'id', 'company', 'chargeToId', 'chargeToType', 'type', 'member', 'paymentMethod', 'classification', 'amount',
+        'billableOption', 'date', 'locationId', 'businessUnitId', 'notes', 'agreement', 'invoiceAmount', 'mobileGuid',
+        'taxes', 'invoice', 'currency', 'status', 'billAmount', 'agreementAmount', 'odometerStart', 'odometerEnd',
+        'ticket', 'project', 'phase', '_info',
+    )
+    DERIVED_ATTRIBUTES = ('amount',)
+
     def __init__(self, **kwargs):
         self.chargeToId = None
         self.chargeToType = None
@@ -26,77 +35,75 @@ class ExpenseEntry:
         return {**vars(self), **expense_dict}
 
     @classmethod
-    def fetch_by_charge_to_ids(cls, charge_to_ids, on_or_after=None, before=None):
-
-        expense_entries = []
-        conditions_start = []
+    def fetch_by_charge_to_ids(cls, charge_to_ids, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = []
         if on_or_after:
-            conditions_start.append('date>=[{}]'.format(on_or_after))
+            conditions.append('date>=[{}]'.format(on_or_after))
         if before:
-            conditions_start.append('date<[{}]'.format(before))
-
-        if conditions_start:
-            conditions_start = ' and '.join(conditions_start) + ' and '
-        else:
-            conditions_start = ''
+            conditions.append('date<[{}]'.format(before))
 
-        conditions = []
-        for i, charge_to_id in enumerate(charge_to_ids):
-            conditions.append('chargeToId={}'.format(charge_to_id))
-            if i > 0 and i % 50 == 0:  # fetch time entries for 100 tickets at a time; any more and the query becomes too long
-                conditions = conditions_start + '(' + ' or '.join(conditions) + ')'
-                expense_entries.extend([cls(**expense_entry) for expense_entry in
-                                     Connectwise.submit_request('expense/entries', conditions)])
-                conditions = []
-        return expense_entries
+        return [record_class(cls, compact, lazy)(**expense_entry) for expense_entry in
+                Connectwise.submit_chunked_request('expense/entries', 'chargeToId', charge_to_ids, conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_charge_to_id(cls, _id):
+    def fetch_by_charge_to_id(cls, _id, fields=None, compact=False, lazy=False):
         conditions = 'chargeToId={}'.format(_id)
-        return [cls(**expense_entry) for expense_entry in Connectwise.submit_request('expense/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**expense_entry) for expense_entry in Connectwise.submit_request('expense/entries', conditions, fields=fields)]
+
+    @classmethod
+    def fetch_by_date_range(cls, on_or_after=None, before=None, parallel=False, fields=None, compact=False, lazy=False):
+        conditions = []
+        if on_or_after:
+            conditions.append('date>=[{}]'.format(on_or_after))
+        if before:
+            conditions.append('date<[{}]'.format(before))
+
+        return [record_class(cls, compact, lazy)(**expense_entry) for expense_entry in
+                                     Connectwise.submit_request('expense/entries', conditions, parallel=parallel, fields=fields)]
 
     @classmethod
-    def fetch_by_date_range(cls, on_or_after=None, before=None):
+    def iter_by_date_range(cls, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        """Yield ExpenseEntries one page at a time instead of holding the whole range in memory"""
         conditions = []
         if on_or_after:
             conditions.append('date>=[{}]'.format(on_or_after))
         if before:
             conditions.append('date<[{}]'.format(before))
 
-        return [cls(**expense_entry) for expense_entry in
-                                     Connectwise.submit_request('expense/entries', conditions)]
+        for expense_entry in Connectwise.iter_request('expense/entries', conditions, fields=fields):
+            yield record_class(cls, compact, lazy)(**expense_entry)
 
     @classmethod
-    def fetch_by_business_unit_id(cls, business_unit_id, on_or_after=None, before=None):
+    def fetch_by_business_unit_id(cls, business_unit_id, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
         conditions = ['businessUnitId={}'.format(business_unit_id)]
         if on_or_after:
             conditions.append('date>=[{}]'.format(on_or_after))
         if before:
             conditions.append('date<[{}]'.format(before))
 
-        return [cls(**expense_entry) for expense_entry in
-                Connectwise.submit_request('expense/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**expense_entry) for expense_entry in
+                Connectwise.submit_request('expense/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_member_identifier(cls, member_identifier, on_or_after=None, before=None):
+    def fetch_by_member_identifier(cls, member_identifier, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
         conditions = ['member/identifier="{}"'.format(member_identifier)]
         if on_or_after:
             conditions.append('date>=[{}]'.format(on_or_after))
         if before:
             conditions.append('date<[{}]'.format(before))
 
-        return [cls(**expense_entry) for expense_entry in
-                Connectwise.submit_request('expense/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**expense_entry) for expense_entry in
+                Connectwise.submit_request('expense/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_company_id(cls, company_id, on_or_after=None, before=None):
+    def fetch_by_company_id(cls, company_id, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
         conditions = ['company/id={}'.format(company_id)]
         if on_or_after:
             conditions.append('date>=[{}]'.format(on_or_after))
         if before:
             conditions.append('date<[{}]'.format(before))
-        return [cls(**expense_entry) for expense_entry in
-                Connectwise.submit_request('expense/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**expense_entry) for expense_entry in
+                Connectwise.submit_request('expense/entries', conditions, fields=fields)]
 
     def fetch_doc_count(self):
         conditions = 'recordId={}&recordType=Expense'.format(self.id)
@@ -144,15 +151,14 @@ class ExpenseType:
         return "<Expense Type {}>".format(self.name)
 
     @classmethod
-    def fetch_all(cls):
-        return [cls(**expense_type) for expense_type in Connectwise.submit_request('expense/types')]
+    def fetch_all(cls, fields=None):
+        return [cls(**expense_type) for expense_type in Connectwise.submit_request('expense/types', fields=fields)]
 
     @classmethod
-    def fetch_mileage_types(cls):
+    def fetch_mileage_types(cls, fields=None):
         conditions = ['mileageFlag=true']
-        return [cls(**expense_type) for expense_type in Connectwise.submit_request('expense/types', conditions)]
+        return [cls(**expense_type) for expense_type in Connectwise.submit_request('expense/types', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_id(cls, _id):
-        conditions = ['id={}'.format(_id)]
-        return [cls(**expense_type) for expense_type in Connectwise.submit_request('expense/types', conditions)][0]
+    def fetch_by_id(cls, _id, fields=None):
+        return [cls(**expense_type) for expense_type in Connectwise.fetch_record('expense/types', _id, fields=fields)][0]
@@ -0,0 +1,80 @@
+"""
+Named field projections per endpoint. Any fetch_* method's fields parameter accepts a profile
+name from here, a list of field names, or a comma separated string, e.g.
+
+    TimeEntry.fetch_by_date_range('2017-07-01', '2018-07-01', fields='billing')
+
+Fields listed in REQUIRED_FIELDS are always requested, because the model constructors need them and
+chunked requests, the cache and the mirror key records on id.
+"""
+
+FIELD_PROFILES = {
+    'time/entries': {
+        'billing': ['id', 'company', 'chargeToId', 'chargeToType', 'member', 'workType', 'workRole', 'timeStart',
+                    'timeEnd', 'actualHours', 'hoursBilled', 'hourlyRate', 'billableOption', 'invoice'],
+        'scheduling': ['id', 'company', 'chargeToId', 'chargeToType', 'member', 'timeStart', 'timeEnd',
+                       'actualHours', 'customFields'],
+        'cost': ['id', 'member', 'workType', 'timeStart', 'actualHours'],
+    },
+    'schedule/entries': {
+        'scheduling': ['id', 'objectId', 'name', 'member', 'where', 'dateStart', 'dateEnd', 'hours', 'type'],
+    },
+    'service/tickets': {
+        'billing': ['id', 'summary', 'recordType', 'company', 'project', 'phase', 'board', 'budgetHours'],
+        'scheduling': ['id', 'summary', 'recordType', 'company', 'project', 'phase', 'board', 'serviceLocation',
+                       'estimatedStartDate', 'budgetHours', 'resources'],
+        'charge_to': ['id', 'summary', 'recordType', 'company', 'project', 'phase'],
+    },
+    'sales/activities': {
+        'scheduling': ['id', 'name', 'company', 'where', 'dateStart', 'dateEnd'],
+        'charge_to': ['id', 'name', 'company', 'opportunity'],
+    },
+    'expense/entries': {
+        'billing': ['id', 'company', 'chargeToId', 'chargeToType', 'member', 'date', 'type', 'classification',
+                    'amount', 'invoiceAmount', 'billableOption', 'invoice'],
+    },
+    'procurement/products': {
+        'billing': ['id', 'description', 'quantity', 'price', 'cost', 'billableOption', 'chargeToId', 'chargeToType',
+                    'purchaseDate', 'company'],
+    },
+    'finance/invoices': {
+        'billing': ['id', 'invoiceNumber', 'company', 'date', 'total', 'applyToType', 'applyToId'],
+    },
+    'system/members': {
+        'cost': ['id', 'identifier', 'firstName', 'lastName', 'officeEmail', 'hourlyCost'],
+    },
+    'company/companies': {
+        'summary': ['id', 'identifier', 'name', 'status', 'phoneNumber', 'addressLine1', 'city', 'state', 'zip'],
+    },
+    'project/projects': {
+        'billing': ['id', 'name', 'company', 'businessUnitId', 'budgetHours', 'estimatedHours',
+                    'estimatedTimeRevenue', 'estimatedExpenseRevenue', 'estimatedProductRevenue',
+                    'estimatedTimeCost', 'estimatedExpenseCost', 'estimatedProductCost'],
+    },
+}
+
+REQUIRED_FIELDS = {
+    'time/entries': ['id'],
+    'service/tickets': ['id', 'summary'],
+    'schedule/entries': ['id', 'objectId'],
+    'sales/activities': ['id'],
+    'expense/entries': ['id'],
+    'procurement/products': ['id', 'description', 'quantity'],
+    'finance/invoices': ['id', 'invoiceNumber', 'total'],
+    'system/members': ['id', 'identifier'],
+    'company/companies': ['id', 'identifier'],
+    'company/contacts': ['id'],
+    'project/projects': ['id', 'name'],
+    'finance/agreements': ['id', 'name'],
+}
+
+
+def fields_to_str(endpoint, fields):
+    """Resolve a profile name, list or comma separated string into the value of the fields query parameter"""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = FIELD_PROFILES.get(endpoint, {}).get(fields, fields.split(','))
+    fields = [field.strip() for field in fields]
+    fields.extend(field for field in REQUIRED_FIELDS.get(endpoint, []) if field not in fields)
+    return ','.join(fields)
@@ -0,0 +1,71 @@
+class IdentityMap:
+    """
+    Shares one copy of each nested reference (company, member, workType, workRole, board, ...) between
+    every record fetched while it is active, instead of one copy per record. References are matched on
+    their field name and id, and only shared when they are equal, so a record never gets stale data.
+    A reference's _info goes with it; a record's own _info carries its lastUpdated, so it is left alone.
+
+        with Connectwise.identity_map() as identities:
+            time_entries = TimeEntry.fetch_by_date_range('2017-07-01', '2018-07-01')
+            company = identities.ref('company', 250)
+            [t for t in time_entries if t.company is company]
+
+    Shared references are the same dict object, so changing one changes it for every record.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._refs = {}
+        self._instances = {}
+
+    def __repr__(self):
+        return "<Identity Map {} references, {} hits, {} misses>".format(len(self._refs), self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._refs)
+
+    def intern(self, record):
+        """Swap the references in a raw record for their shared copies, in place. Returns the record"""
+        for field, value in record.items():
+            if type(value) is not dict or 'id' not in value:
+                continue
+            shared = self._refs.setdefault((field, value['id']), value)
+            if shared is value:
+                self.misses += 1
+            elif shared == value:
+                record[field] = shared
+                self.hits += 1
+        return record
+
+    def intern_all(self, records):
+        for record in records:
+            self.intern(record)
+        return records
+
+    def ref(self, field, _id):
+        """The shared reference for field and id, e.g. ref('company', 250), or None"""
+        return self._refs.get((field, _id))
+
+    def link(self, field, instances):
+        """
+        Link the references in field to live model objects with the same id, e.g. link('company', companies)
+        or link('member', members), for instance() to look up.
+        """
+        for instance in instances:
+            self._instances[(field, instance.id)] = instance
+
+    def instance(self, field, ref):
+        """The live object linked to a reference, e.g. instance('company', time_entry.company), or None"""
+        if ref is None:
+            return None
+        return self._instances.get((field, ref['id']))
+
+    def clear(self):
+        self._refs.clear()
+        self._instances.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._refs)}
@@ -1,9 +1,23 @@
 from decimal import Decimal
 
 from lib.connectwise_py.connectwise.connectwise import Connectwise
+from lib.connectwise_py.connectwise.records import record_class
 
 
 class Invoice:
+    RECORD_FIELDS = (
+        'id', 'invoiceNumber', 'type', 'status', 'company', 'billToCompany', 'shipToCompany', 'applyToType',
+        'applyToId', 'attention', 'billingSite', 'shippingSite', 'billingTerms', 'reference', 'customerPO',
+        'templateSetupId', 'emailTemplateId', 'addToBatchEmailList', 'date', 'restrictDownpaymentFlag', 'locationId',
+        'departmentId', 'territory', 'topComment', 'bottomComment', 'taxableFlag', 'taxCode', 'internalNotes',
+        'downpaymentPreviouslyTaxedFlag', 'serviceTotal', 'dueDate', 'expenseTotal', 'productTotal',
+        'previousProgressApplied', 'serviceAdjustmentAmount', 'agreementAmount', 'downpaymentApplied', 'subtotal',
+        'total', 'remainingDownpayment', 'salesTax', 'adjustmentReason', 'adjustedBy', 'payments', 'credits',
+        'balance', 'specialInvoiceFlag', 'billingSetupReference', 'ticket', 'project', 'phase', 'salesOrder',
+        'agreement', 'glBatch', 'customFields', '_info',
+    )
+    DERIVED_ATTRIBUTES = ('total',)
+
     def __init__(self, **kwargs):
         self.applyToType = None
         self.applyToId = None
@@ -15,35 +29,35 @@ class Invoice:
         return "<Invoice {}>".format(self.invoiceNumber)
 
     @classmethod
-    def fetch_by_invoice_number(cls, invoice_number):
+    def fetch_by_invoice_number(cls, invoice_number, fields=None, compact=False, lazy=False):
         conditions = ['invoiceNumber="{}"'.format(invoice_number)]
-        return [cls(**invoice) for invoice in
-                Connectwise.submit_request('finance/invoices', conditions)][0]
+        return [record_class(cls, compact, lazy)(**invoice) for invoice in
+                Connectwise.submit_request('finance/invoices', conditions, fields=fields)][0]
 
     @classmethod
-    def fetch_by_date_range(cls, on_or_after=None, before=None):
+    def fetch_by_date_range(cls, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
         conditions = []
         if on_or_after:
             conditions.append('date>=[{}]'.format(on_or_after))
         if before:
             conditions.append('date<[{}]'.format(before))
 
-        return [cls(**invoice) for invoice in
-                Connectwise.submit_request('finance/invoices', conditions)]
+        return [record_class(cls, compact, lazy)(**invoice) for invoice in
+                Connectwise.submit_request('finance/invoices', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_company(cls, company_id, on_or_after=None, before=None):
+    def fetch_by_company(cls, company_id, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
         conditions = ['company/id={}'.format(company_id)]
         if on_or_after:
             conditions.append('date>=[{}]'.format(on_or_after))
         if before:
             conditions.append('date<[{}]'.format(before))
 
-        return [cls(**invoice) for invoice in
-                Connectwise.submit_request('finance/invoices', conditions)]
+        return [record_class(cls, compact, lazy)(**invoice) for invoice in
+                Connectwise.submit_request('finance/invoices', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_project_id(cls, project_id):
+    def fetch_by_project_id(cls, project_id, fields=None, compact=False, lazy=False):
         conditions = ['applyToId={}'.format(project_id), 'applyToType="Project"']
-        return [cls(**invoice) for invoice in
-                Connectwise.submit_request('finance/invoices', conditions)]
+        return [record_class(cls, compact, lazy)(**invoice) for invoice in
+                Connectwise.submit_request('finance/invoices', conditions, fields=fields)]
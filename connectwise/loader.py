@@ -0,0 +1,141 @@
+import copy
+
+from .connectwise import Connectwise
+
+
+class BatchLoader:
+    """
+    Collect single-record lookups and resolve them together with a few '(id=a or id=b ...)'
+    queries instead of one request per id.
+
+        with BatchLoader('service/tickets', Ticket) as tickets:
+            pending = [tickets.load(t.chargeToId) for t in time_entries]
+        ticket = pending[0].value
+
+    Lookups already in Connectwise.cache are answered from it. Resolved records, and ids that do not
+    exist, are written to it, so any fetch_by_id call made afterwards for the same ids is answered
+    without a round trip.
+    """
+
+    def __init__(self, endpoint, cls=None, key='id', max_length=None):
+        """
+        :param endpoint: e.g. 'service/tickets'
+        :param cls: model class to build results with. Raw records are returned when None
+        :param key: field the lookups are made on, e.g. 'identifier' for 'system/members'
+        :param max_length: maximum URL-encoded length of each query's conditions
+        """
+        self.endpoint = endpoint
+        self.cls = cls
+        self.key = key
+        self.max_length = max_length
+        self.requests = 0
+        self._pending = {}
+        self._records = {}
+
+    def __repr__(self):
+        return "<Batch Loader {} {} loaded, {} pending>".format(self.endpoint, len(self._records), len(self._pending))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.dispatch()
+
+    def load(self, value):
+        """Queue a lookup and return a Pending whose .value resolves the whole batch on first access"""
+        if value not in self._records:
+            self._pending.setdefault(value)
+        return Pending(self, value)
+
+    def load_many(self, values):
+        """Resolve values immediately and return their results in the same order"""
+        pending = [self.load(value) for value in values]
+        self.dispatch()
+        return [p.value for p in pending]
+
+    def prime(self, values):
+        """Fetch values into the loader and Connectwise.cache without building results"""
+        for value in values:
+            self.load(value)
+        self.dispatch()
+
+    def dispatch(self):
+        pending, self._pending = list(self._pending), {}
+        # whatever fetch_by_id or an earlier loader already cached needs no query
+        uncached = []
+        for value in pending:
+            records = Connectwise.cached_records(self.endpoint, self.key, value)
+            if records is None:
+                uncached.append(value)
+            else:
+                self._records[value] = records[0] if records else None
+        pending = uncached
+        if not pending:
+            return
+        found = {}
+        self.requests += len(list(Connectwise.chunk_conditions(self.key, pending, self.max_length)))
+        for record in Connectwise.submit_chunked_request(self.endpoint, self.key, pending, max_length=self.max_length,
+                                                         unique_key=None):
+            found['{}'.format(record[self.key]).lower()] = record
+        for value in pending:
+            record = found.get('{}'.format(value).lower())
+            self._records[value] = record
+            Connectwise.cache_records(self.endpoint, self.key, value, [record] if record else [])
+
+    def get(self, value):
+        if value not in self._records:
+            self.load(value)
+            self.dispatch()
+        record = self._records[value]
+        if record is None:
+            return None
+        record = copy.deepcopy(record)
+        return self.cls(**record) if self.cls else record
+
+
+class Pending:
+    def __init__(self, loader, value):
+        self.loader = loader
+        self.key = value
+
+    def __repr__(self):
+        return "<Pending {} {}>".format(self.loader.endpoint, self.key)
+
+    @property
+    def value(self):
+        return self.loader.get(self.key)
+
+
+def prime_related(entries, tickets=True, activities=True, members=True):
+    """
+    Batch-fetch the Tickets, Activities and Members that get_charge_to_info, ExpenseEntry.get_ticket
+    and TimeEntry.fetch_estimated_cost would otherwise fetch one entry at a time.
+    entries can mix Time, Expense and Schedule Entries. Returns the loaders used, keyed by endpoint.
+    """
+    ticket_ids, activity_ids, object_ids, identifiers = set(), set(), set(), set()
+    for entry in entries:
+        if getattr(entry, 'chargeToId', None):
+            if entry.chargeToType in ('ServiceTicket', 'ProjectTicket'):
+                ticket_ids.add(entry.chargeToId)
+            elif entry.chargeToType == 'Activity':
+                activity_ids.add(entry.chargeToId)
+        elif getattr(entry, 'objectId', None):
+            object_ids.add(entry.objectId)
+        member = getattr(entry, 'member', None)
+        if member and member.get('identifier'):
+            identifiers.add(member['identifier'])
+
+    loaders = {}
+    if tickets:
+        loaders['service/tickets'] = BatchLoader('service/tickets')
+        loaders['service/tickets'].prime(sorted(ticket_ids | object_ids))
+        # schedule entries do not say what their objectId is, so whatever is not a ticket may be an activity
+        activity_ids |= {_id for _id in object_ids if loaders['service/tickets'].get(_id) is None}
+    if activities:
+        loaders['sales/activities'] = BatchLoader('sales/activities')
+        loaders['sales/activities'].prime(sorted(activity_ids))
+    if members:
+        loaders['system/members'] = BatchLoader('system/members', key='identifier')
+        loaders['system/members'].prime(sorted(identifiers))
+    return loaders
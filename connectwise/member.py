@@ -17,32 +17,37 @@ class Member:
         return "<Member {}>".format(self.identifier)
 
     @classmethod
-    def fetch_active(cls):
+    def fetch_active(cls, fields=None):
         conditions = ['identifier!="APIMember" and identifier!="screenconnect" and identifier!="quosal" and identifier!="labtech"']
         conditions.append('inactiveFlag=false')
         filters = {'orderBy': 'lastName asc'}
-        return [cls(**member) for member in Connectwise.submit_request('system/members', conditions, filters)]
+        return [cls(**member) for member in Connectwise.submit_request('system/members', conditions, filters, fields=fields)]
 
     @classmethod
-    def fetch_member_by_office_email(cls, officeEmail):
+    def fetch_member_by_office_email(cls, officeEmail, fields=None):
         conditions = ['officeEmail="{}"'.format(officeEmail)]
-        member = Connectwise.submit_request('system/members', conditions)[0]
+        member = Connectwise.submit_request('system/members', conditions, fields=fields)[0]
         return cls(**member)
 
     @classmethod
-    def fetch_member_by_identifier(cls, identifier):
-        conditions = ['identifier="{}"'.format(identifier)]
-        member = Connectwise.submit_request('system/members', conditions)[0]
+    def fetch_member_by_identifier(cls, identifier, fields=None):
+        member = Connectwise.fetch_record('system/members', identifier, key='identifier', fields=fields)[0]
         return cls(**member)
 
     @classmethod
-    def fetch_all_members(cls):
+    async def fetch_member_by_identifier_async(cls, client, identifier, fields=None):
+        conditions = Connectwise.condition('identifier', identifier)
+        member = (await client.submit_request('system/members', conditions, fields=fields))[0]
+        return cls(**member)
+
+    @classmethod
+    def fetch_all_members(cls, fields=None):
         conditions = ['identifier!="APIMember" and identifier!="screenconnect" and identifier!="quosal" and identifier!="labtech"']
         filters = {'orderBy': 'lastName asc'}
-        return [cls(**member) for member in Connectwise.submit_request('system/members', conditions, filters)]
+        return [cls(**member) for member in Connectwise.submit_request('system/members', conditions, filters, fields=fields)]
 
     @classmethod
-    def fetch_by_type_name(cls, type_name):
+    def fetch_by_type_name(cls, type_name, fields=None):
         """
         Return members filtered by type. For example, "Salaried Employee"
         :param type_name: str: member type, e.g. "Salaried Employee"
@@ -50,7 +55,7 @@ class Member:
         """
         conditions = 'type/name="{}"'.format(type_name)
         filters = {'orderBy': 'lastName asc'}
-        return [cls(**member) for member in Connectwise.submit_request('system/members', conditions, filters)]
+        return [cls(**member) for member in Connectwise.submit_request('system/members', conditions, filters, fields=fields)]
 
     def hourly_cost(self, on_date='today'):
         if on_date.lower() == 'today' or on_date >= Connectwise.current_fy()[0]:
@@ -83,3 +88,54 @@ class Member:
             return [a for a in agreements if a.contact['id'] == contact.id]
         else:
             return []
+
+
+class MemberRegistry:
+    """
+    Members keyed by identifier, with each member's hourly cost worked out once per FY instead of
+    once per call, for estimating the cost of many Time Entries at once.
+
+        registry = MemberRegistry(Member.fetch_all_members())
+        costs = TimeEntry.fetch_estimated_costs(time_entries, member_registry=registry)
+    """
+
+    def __init__(self, members=[]):
+        self.members = {}
+        for member in members:
+            self.members.setdefault(member.identifier, member)
+        self.current_fy_start = Connectwise.current_fy()[0]
+        self._hourly_costs = {}
+
+    def __repr__(self):
+        return "<Member Registry {} members, {} hourly costs>".format(len(self.members), len(self._hourly_costs))
+
+    def __len__(self):
+        return len(self.members)
+
+    def get(self, identifier):
+        return self.members.get(identifier)
+
+    def fetch_missing(self, identifiers):
+        """Fetch the members with these identifiers that are not in the registry yet, in batches"""
+        from .loader import BatchLoader
+        identifiers = sorted(set(identifiers) - set(self.members))
+        if identifiers:
+            for member in BatchLoader('system/members', Member, key='identifier').load_many(identifiers):
+                if member:
+                    self.members.setdefault(member.identifier, member)
+
+    def fy(self, on_date):
+        """The FY on_date ('YYYY-MM-DD') falls in as used by Member.hourly_cost, with 'current' for the current FY"""
+        if on_date.lower() == 'today' or on_date >= self.current_fy_start:
+            return 'current'
+        year = int(on_date[:4])
+        return '{}-{}'.format(year, year + 1) if int(on_date[5:7]) >= 7 else '{}-{}'.format(year - 1, year)
+
+    def hourly_cost(self, member, on_date='today'):
+        """Same as member.hourly_cost(on_date), computed once per member and FY"""
+        key = (member.identifier, self.fy(on_date))
+        try:
+            return self._hourly_costs[key]
+        except KeyError:
+            hourly_cost = self._hourly_costs[key] = member.hourly_cost(on_date)
+            return hourly_cost
@@ -0,0 +1,322 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from .decoding import loads
+from .fields import fields_to_str
+
+
+class UnsupportedQuery(ValueError):
+    """Raised when conditions cannot be answered from the mirror, so the caller falls back to the API"""
+
+
+class SQLiteMirror:
+    """
+    A local SQLite copy of Connectwise records, usable as a DeltaSync store and as a read-only
+    stand-in for the API:
+
+        mirror = SQLiteMirror('cw.sqlite', max_age=3600)
+        DeltaSync(mirror).sync_all(since='2017-07-01')
+        Connectwise.mirror = mirror
+        TimeEntry.fetch_by_company_id(250, '2018-01-01', '2018-02-01')  # answered from cw.sqlite
+
+    GET requests are answered from the mirror when the endpoint was synced less than max_age seconds
+    ago and the conditions only use operators the mirror understands (=, !=, <, <=, >, >=, contains,
+    like, and, or, parentheses). Anything else, and any child conditions, go to the API as usual.
+    The mirror assumes it holds every record a query could match, so sync a wide enough date range.
+    """
+    # endpoint: (table, date field)
+    TABLES = {
+        'time/entries': ('time_entries', 'timeStart'),
+        'schedule/entries': ('schedule_entries', 'dateStart'),
+        'service/tickets': ('tickets', 'estimatedStartDate'),
+        'sales/activities': ('activities', 'dateStart'),
+        'project/projects': ('projects', 'estimatedStart'),
+        'project/phases': ('phases', 'scheduledStart'),
+        'expense/entries': ('expense_entries', 'date'),
+        'procurement/products': ('products', 'purchaseDate'),
+        'finance/invoices': ('invoices', 'date'),
+        'system/members': ('members', None),
+        'company/companies': ('companies', None),
+        'company/contacts': ('contacts', None),
+    }
+    # field path: indexed column
+    COLUMNS = {
+        'chargeToId': 'charge_to_id',
+        'objectId': 'object_id',
+        'company/id': 'company_id',
+        'member/identifier': 'member_identifier',
+        'identifier': 'identifier',
+        'projectId': 'project_id',
+    }
+    PHASES_ENDPOINT = re.compile(r'^project/projects/(\d+)/phases$')
+
+    def __init__(self, path=':memory:', max_age=3600):
+        """
+        :param path: SQLite database file
+        :param max_age: seconds after its last sync that an endpoint is still answered from the mirror
+        """
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS sync_state '
+                             '(endpoint TEXT PRIMARY KEY, watermark TEXT, synced_at REAL)')
+            columns = ', '.join(self.COLUMNS.values())
+            for table, date_field in self.TABLES.values():
+                self._db.execute('CREATE TABLE IF NOT EXISTS {} (id INTEGER PRIMARY KEY, {}, date TEXT, data TEXT)'
+                                 .format(table, columns))
+                for column in list(self.COLUMNS.values()) + ['date']:
+                    self._db.execute('CREATE INDEX IF NOT EXISTS {0}_{1} ON {0} ({1})'.format(table, column))
+
+    def __repr__(self):
+        return "<SQLite Mirror {}>".format(self.path)
+
+    def close(self):
+        self._db.close()
+
+    # DeltaSync store interface
+
+    def upsert(self, endpoint, records):
+        table, date_field = self._table(endpoint)
+        rows = [[record['id']] + [self._extract(record, path) for path in self.COLUMNS] +
+                [record.get(date_field) if date_field else None, json.dumps(record)]
+                for record in records]
+        placeholders = ', '.join('?' * (len(self.COLUMNS) + 3))
+        with self._lock, self._db:
+            self._db.executemany('INSERT OR REPLACE INTO {} VALUES ({})'.format(table, placeholders), rows)
+
+    def records(self, endpoint):
+        table, date_field = self._table(endpoint)
+        with self._lock:
+            return [loads(data) for data, in self._db.execute('SELECT data FROM {}'.format(table))]
+
+    def get_watermark(self, endpoint):
+        with self._lock:
+            row = self._db.execute('SELECT watermark FROM sync_state WHERE endpoint = ?', (endpoint,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, endpoint, watermark):
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)', (endpoint, watermark, time.time()))
+
+    def load(self, endpoint, records):
+        """Replace everything stored for endpoint with a full pull of its records, and mark it fresh"""
+        table, date_field = self._table(endpoint)
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM {}'.format(table))
+        self.upsert(endpoint, records)
+        self.mark_synced(endpoint)
+
+    def mark_synced(self, endpoint):
+        with self._lock, self._db:
+            self._db.execute('INSERT OR IGNORE INTO sync_state VALUES (?, NULL, NULL)', (endpoint,))
+            self._db.execute('UPDATE sync_state SET synced_at = ? WHERE endpoint = ?', (time.time(), endpoint))
+
+    # answering requests
+
+    def is_fresh(self, endpoint):
+        endpoint, extra = self._resolve_endpoint(endpoint)
+        if endpoint not in self.TABLES:
+            return False
+        with self._lock:
+            row = self._db.execute('SELECT synced_at FROM sync_state WHERE endpoint = ?', (endpoint,)).fetchone()
+        return bool(row and row[0] and time.time() - row[0] <= self.max_age)
+
+    def query(self, endpoint, conditions='', filters=None, fields=None):
+        """Answer a GET request like Connectwise.submit_request would, or raise UnsupportedQuery"""
+        filters = filters or {}
+        if filters.get('page', 1) != 1:
+            raise UnsupportedQuery('Paged requests are not answered from the mirror')
+        endpoint, extra = self._resolve_endpoint(endpoint)
+        conditions = ' and '.join('({})'.format(c) for c in (conditions, extra) if c)
+        table, date_field = self._table(endpoint)
+
+        where, params = ConditionsParser(conditions, self._column_for(date_field)).parse()
+        sql = 'SELECT data FROM {}'.format(table)
+        if where:
+            sql += ' WHERE {}'.format(where)
+        if filters.get('orderBy'):
+            sql += ' ORDER BY {}'.format(self._order_by(filters['orderBy'], date_field))
+        else:
+            sql += ' ORDER BY id'
+
+        with self._lock:
+            records = [loads(data) for data, in self._db.execute(sql, params)]
+        self.hits += 1
+
+        fields = fields_to_str(endpoint, fields)
+        if fields:
+            keep = {field.split('/')[0] for field in fields.split(',')}
+            records = [{k: v for k, v in record.items() if k in keep} for record in records]
+        return records
+
+    def _resolve_endpoint(self, endpoint):
+        match = self.PHASES_ENDPOINT.match(endpoint)
+        if match:
+            return 'project/phases', 'projectId={}'.format(match.group(1))
+        return endpoint, ''
+
+    def _table(self, endpoint):
+        try:
+            return self.TABLES[endpoint]
+        except KeyError:
+            raise UnsupportedQuery('{} is not mirrored'.format(endpoint))
+
+    def _column_for(self, date_field):
+        def column_for(path):
+            if path == 'id':
+                return 'id'
+            if path in self.COLUMNS:
+                return self.COLUMNS[path]
+            if date_field and path == date_field:
+                return 'date'
+            return "json_extract(data, '$.{}')".format(path.replace('/', '.'))
+        return column_for
+
+    def _order_by(self, order_by, date_field):
+        column_for = self._column_for(date_field)
+        clauses = []
+        for clause in order_by.split(','):
+            parts = clause.split()
+            if not parts or not re.match(r'^[\w/]+$', parts[0]) or len(parts) > 2 or \
+                    (len(parts) == 2 and parts[1].lower() not in ('asc', 'desc')):
+                raise UnsupportedQuery('Cannot order by {}'.format(order_by))
+            clauses.append('{} {}'.format(column_for(parts[0]), parts[1].upper() if len(parts) == 2 else 'ASC'))
+        return ', '.join(clauses)
+
+    @classmethod
+    def _extract(cls, record, path):
+        value = record
+        for key in path.split('/'):
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        return value
+
+
+class ConditionsParser:
+    """Translate a Connectwise conditions string into a SQL WHERE clause and its parameters"""
+    TOKENS = re.compile(r'''
+        \s*(?:
+            (?P<string>"(?:[^"\\]|\\.)*")
+          | (?P<date>\[[^\]]*\])
+          | (?P<number>-?\d+(?:\.\d+)?(?![\w/]))
+          | (?P<op>>=|<=|!=|<>|=|<|>)
+          | (?P<paren>[()])
+          | (?P<word>[A-Za-z_][\w/]*)
+        )''', re.VERBOSE)
+    TIMESTAMP = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2}))?Z?)?$')
+    OPERATORS = {'=': '=', '!=': '!=', '<>': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+    def __init__(self, conditions, column_for):
+        self.tokens = self._tokenize(conditions or '')
+        self.position = 0
+        self.column_for = column_for
+        self.params = []
+
+    def parse(self):
+        if not self.tokens:
+            return '', []
+        where = self._or()
+        if self.position != len(self.tokens):
+            raise UnsupportedQuery('Unexpected {}'.format(self.tokens[self.position][1]))
+        return where, self.params
+
+    def _tokenize(self, conditions):
+        tokens = []
+        position = 0
+        conditions = conditions.rstrip()
+        while position < len(conditions):
+            match = self.TOKENS.match(conditions, position)
+            if not match:
+                raise UnsupportedQuery('Cannot parse conditions: {}'.format(conditions))
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+        return tokens
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def _or(self):
+        clauses = [self._and()]
+        while self._peek()[0] == 'word' and self._peek()[1].lower() == 'or':
+            self._next()
+            clauses.append(self._and())
+        return clauses[0] if len(clauses) == 1 else '({})'.format(' OR '.join(clauses))
+
+    def _and(self):
+        clauses = [self._factor()]
+        while self._peek()[0] == 'word' and self._peek()[1].lower() == 'and':
+            self._next()
+            clauses.append(self._factor())
+        return clauses[0] if len(clauses) == 1 else '({})'.format(' AND '.join(clauses))
+
+    def _factor(self):
+        kind, value = self._next()
+        if kind == 'paren' and value == '(':
+            clause = self._or()
+            if self._next() != ('paren', ')'):
+                raise UnsupportedQuery('Unbalanced parentheses')
+            return clause
+        if kind != 'word':
+            raise UnsupportedQuery('Expected a field name, got {}'.format(value))
+        column = self.column_for(value)
+
+        kind, operator = self._next()
+        if kind == 'word' and operator.lower() in ('contains', 'like'):
+            kind, value = self._next()
+            if kind != 'string':
+                raise UnsupportedQuery('{} needs a string'.format(operator))
+            value = self._string(value)
+            if operator.lower() == 'contains':
+                value = '%{}%'.format(value.replace('\\', '\\\\').replace('%', r'\%').replace('_', r'\_'))
+                self.params.append(value)
+                return "{} LIKE ? ESCAPE '\\'".format(column)
+            self.params.append(value.replace('\\', '\\\\').replace('%', r'\%').replace('_', r'\_').replace('*', '%'))
+            return "{} LIKE ? ESCAPE '\\'".format(column)
+        if kind != 'op':
+            raise UnsupportedQuery('Unsupported operator {}'.format(operator))
+
+        kind, value = self._next()
+        if kind == 'word' and value.lower() == 'null':
+            if operator not in ('=', '!=', '<>'):
+                raise UnsupportedQuery('null can only be compared with = or !=')
+            return '{} IS {}NULL'.format(column, '' if operator == '=' else 'NOT ')
+        if kind == 'word' and value.lower() in ('true', 'false'):
+            self.params.append(1 if value.lower() == 'true' else 0)
+        elif kind == 'number':
+            self.params.append(float(value) if '.' in value else int(value))
+        elif kind == 'date':
+            self.params.append(self._timestamp(value[1:-1]))
+        elif kind == 'string':
+            self.params.append(self._string(value))
+            return '{} {} ? COLLATE NOCASE'.format(column, self.OPERATORS[operator])
+        else:
+            raise UnsupportedQuery('Unsupported value {}'.format(value))
+        return '{} {} ?'.format(column, self.OPERATORS[operator])
+
+    @classmethod
+    def _timestamp(cls, value):
+        """
+        A [date] bound in the format Connectwise stores timestamps in, so that comparing them as text
+        agrees with the API: [2024-01-05] is midnight, 2024-01-05T00:00:00Z
+        """
+        match = cls.TIMESTAMP.match(value.strip())
+        if not match:
+            raise UnsupportedQuery('Cannot compare against date {}'.format(value))
+        day, hours, minutes, seconds = match.groups()
+        return '{}T{}:{}:{}Z'.format(day, hours or '00', minutes or '00', seconds or '00')
+
+    @staticmethod
+    def _string(token):
+        return re.sub(r'\\(.)', r'\1', token[1:-1])
@@ -0,0 +1,66 @@
+from bisect import bisect_left
+
+
+class PartitionedStore:
+    """
+    Time Entries, Invoices and Expense Entries grouped by company id, each group sorted by date, so
+    that one company's records in a date range are a dict lookup and two bisects instead of a scan of
+    every record. Company methods that filter a list by company and date accept a store in its place:
+
+        store = PartitionedStore(time_entries=time_entries, invoices=invoices)
+        for company in companies:
+            company.fetch_invoiced_amount(store, '2017-07-01', '2018-07-01')
+
+    Records within a range come back in date order.
+    """
+    DATE_FIELDS = {
+        'time_entries': 'timeStart',
+        'invoices': 'date',
+        'expense_entries': 'date',
+    }
+
+    def __init__(self, time_entries=[], invoices=[], expense_entries=[]):
+        self.partitions = {}
+        self.add('time_entries', time_entries)
+        self.add('invoices', invoices)
+        self.add('expense_entries', expense_entries)
+
+    def __repr__(self):
+        return "<Partitioned Store {}>".format(
+            ', '.join('{} {}'.format(sum(len(p[1]) for p in partitions.values()), kind)
+                      for kind, partitions in self.partitions.items()))
+
+    def add(self, kind, records):
+        """Add records of kind ('time_entries', 'invoices' or 'expense_entries'), re-sorting the partitions they land in"""
+        date_field = self.DATE_FIELDS[kind]
+        partitions = self.partitions.setdefault(kind, {})
+        grouped = {}
+        for record in records:
+            grouped.setdefault(record.company['id'], []).append((getattr(record, date_field)[:10], record))
+        for company_id, dated in grouped.items():
+            if company_id in partitions:
+                dated = list(zip(*partitions[company_id])) + dated
+            dated.sort(key=lambda item: item[0])
+            partitions[company_id] = ([date for date, _ in dated], [record for _, record in dated])
+
+    def company_ids(self, kind):
+        return list(self.partitions.get(kind, {}))
+
+    def range(self, kind, company_id, on_or_after=None, before=None):
+        """Records of kind for company_id dated on_or_after <= date < before ('YYYY-MM-DD', None for no bound)"""
+        partition = self.partitions.get(kind, {}).get(company_id)
+        if partition is None:
+            return []
+        dates, records = partition
+        lo = bisect_left(dates, on_or_after) if on_or_after else 0
+        hi = bisect_left(dates, before) if before else len(dates)
+        return records[lo:hi]
+
+    def time_entries(self, company_id, on_or_after=None, before=None):
+        return self.range('time_entries', company_id, on_or_after, before)
+
+    def invoices(self, company_id, on_or_after=None, before=None):
+        return self.range('invoices', company_id, on_or_after, before)
+
+    def expense_entries(self, company_id, on_or_after=None, before=None):
+        return self.range('expense_entries', company_id, on_or_after, before)
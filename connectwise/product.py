@@ -8,9 +8,22 @@ from decimal import Decimal
 from pprint import pprint
 
 from .connectwise import Connectwise
+from .records import record_class
+from .service_location import ServiceLocationIndex
 
 
 class Product:
+    RECORD_FIELDS = (
+        'id', 'catalogItem', 'description', 'sequenceNumber', 'quantity', 'unitOfMeasure', 'price', 'cost',
+        'extPrice', 'extCost', 'discount', 'margin', 'agreementAmount', 'priceMethod', 'billableOption', 'locationId',
+        'location', 'businessUnitId', 'businessUnit', 'vendorSku', 'taxableFlag', 'dropshipFlag', 'specialOrderFlag',
+        'customerDescription', 'internalNotes', 'productSuppliedFlag', 'subContractorShipToId',
+        'subContractorAmountLimit', 'recurring', 'sla', 'entityType', 'chargeToId', 'chargeToType', 'ticket',
+        'project', 'phase', 'opportunity', 'invoice', 'warehouse', 'warehouseBin', 'company', 'purchaseDate',
+        'customFields', '_info',
+    )
+    DERIVED_ATTRIBUTES = ()
+
     def __init__(self, **kwargs):
         self.purchaseDate = None
         self.internalNotes = None
@@ -35,7 +48,7 @@ class Product:
         product = Connectwise.submit_request('procurement/products', conditions, verb='POST')
         return cls(**product)
 
-    def to_dict(self, include_self=False, schedule_entries=[], tickets=[], activities=[]):
+    def to_dict(self, include_self=False, schedule_entries=[], tickets=[], activities=[], location_index=None):
         """
         Get a representation of the Product object as a Python Dictionary,
         including calculated values from methods.
@@ -46,62 +59,69 @@ class Product:
 
         :param include_self: when True, include the original object under the dictionary
         key 'self' so that you have it in case you need to reference it later
+        :param location_index: a ServiceLocationIndex of schedule_entries, tickets and activities
         """
         dict = {}
         dict['billable_amount'] = self.billable_amount()
         dict['total_cost'] = self.total_cost()
-        dict['service_location'] = self.service_location(schedule_entries, tickets, activities)
+        dict['service_location'] = self.service_location(schedule_entries, tickets, activities, location_index)
         if include_self: dict['self'] = self
         return {**vars(self), **dict}
 
+    @staticmethod
+    def to_dicts(products, include_self=False, schedule_entries=[], tickets=[], activities=[]):
+        """to_dict of every Product in products, indexing the related lists once rather than per product"""
+        location_index = ServiceLocationIndex(schedule_entries, tickets, activities)
+        return [product.to_dict(include_self, schedule_entries, tickets, activities, location_index)
+                for product in products]
+
     @classmethod
-    def fetch_all(cls):
-        return [cls(**product) for product in Connectwise.submit_request('procurement/products')]
+    def fetch_all(cls, fields=None, compact=False, lazy=False):
+        return [record_class(cls, compact, lazy)(**product) for product in Connectwise.submit_request('procurement/products', fields=fields)]
 
     @classmethod
-    def fetch_by_id(cls, _id):
-        conditions = ['id={}'.format(_id)]
-        return [cls(**product) for product in Connectwise.submit_request('procurement/products', conditions)][0]
+    def fetch_by_id(cls, _id, fields=None, compact=False, lazy=False):
+        return [record_class(cls, compact, lazy)(**product) for product in Connectwise.fetch_record('procurement/products', _id, fields=fields)][0]
 
     @classmethod
-    def fetch_by_description(cls, description):
+    def fetch_by_description(cls, description, fields=None, compact=False, lazy=False):
         conditions = ['description contains "{}"'.format(description)]
-        return [cls(**product) for product in Connectwise.submit_request('procurement/products', conditions)]
+        return [record_class(cls, compact, lazy)(**product) for product in Connectwise.submit_request('procurement/products', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_catalog_item_identifier(cls, catalog_item_identifier, identifier_operator='=', charge_to_type=None):
+    def fetch_by_catalog_item_identifier(cls, catalog_item_identifier, identifier_operator='=', charge_to_type=None, fields=None, compact=False, lazy=False):
         conditions = ['catalogItem/identifier {} "{}"'.format(identifier_operator, catalog_item_identifier)]
         if charge_to_type: conditions.append('chargeToType="{}"'.format(charge_to_type))
-        return [cls(**product) for product in Connectwise.submit_request('procurement/products', conditions)]
+        return [record_class(cls, compact, lazy)(**product) for product in Connectwise.submit_request('procurement/products', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_catalog_item_id(cls, catalog_item_id):
+    def fetch_by_catalog_item_id(cls, catalog_item_id, fields=None, compact=False, lazy=False):
         conditions = ['catalogItem/id={}'.format(catalog_item_id)]
-        return [cls(**product) for product in Connectwise.submit_request('procurement/products', conditions)]
+        return [record_class(cls, compact, lazy)(**product) for product in Connectwise.submit_request('procurement/products', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_subcategory_id(cls, subcategory_id):
+    def fetch_by_subcategory_id(cls, subcategory_id, fields=None, compact=False, lazy=False):
         catalog_product_ids = [cp.id for cp in CatalogProduct.fetch_by_subcategory_id(subcategory_id)]
         products = []
         for catalog_product_id in catalog_product_ids:
-            products.extend(cls.fetch_by_catalog_item_id(catalog_product_id))
+            products.extend(cls.fetch_by_catalog_item_id(catalog_product_id, fields, compact, lazy))
         return products
 
     @classmethod
-    def fetch_by_category_name(cls, category_name, operator='='):
+    def fetch_by_category_name(cls, category_name, operator='=', fields=None, compact=False, lazy=False):
         catalog_product_ids = [cp.id for cp in CatalogProduct.fetch_by_category_name(category_name, operator)]
         products = []
         for catalog_product_id in catalog_product_ids:
-            products.extend(cls.fetch_by_catalog_item_id(catalog_product_id))
+            products.extend(cls.fetch_by_catalog_item_id(catalog_product_id, fields, compact, lazy))
         return products
 
     @classmethod
-    def fetch_by_project_id(cls, project_id, ticket_ids=[], company_id=None, updated_on_or_after=None):
+    def fetch_by_project_id(cls, project_id, ticket_ids=[], company_id=None, updated_on_or_after=None, fields=None, compact=False, lazy=False):
         conditions = [
             'chargeToId={}'.format(project_id),
             'chargeToType="Project"'
         ]
-        products = [cls(**product) for product in Connectwise.submit_request('procurement/products', conditions)]
+        products = [record_class(cls, compact, lazy)(**product) for product in Connectwise.submit_request('procurement/products', conditions, fields=fields)]
         ticket_products = [p for p in products if p.chargeToType == 'Ticket']
         ticket_product_ids = [p.id for p in ticket_products]
         ticket_products.extend([p for p in products if p.chargeToType == 'Project' and p.id not in ticket_product_ids])
@@ -111,25 +131,25 @@ class Product:
         return ticket_products
 
     @classmethod
-    def fetch_by_ticket_ids(cls, ticket_ids, company_id=None, updated_on_or_after=None):
+    def fetch_by_ticket_ids(cls, ticket_ids, company_id=None, updated_on_or_after=None, fields=None, compact=False, lazy=False):
         conditions = ['chargeToType="Ticket"']
         if company_id:
             conditions.append('company/id={}'.format(company_id))
         if updated_on_or_after:
             conditions.append('lastUpdated>=[{}]'.format(updated_on_or_after))
-        products = [cls(**product) for product in Connectwise.submit_request('procurement/products', conditions)]
+        products = [record_class(cls, compact, lazy)(**product) for product in Connectwise.submit_request('procurement/products', conditions, fields=fields)]
         return [p for p in products if p.chargeToId in ticket_ids]
 
     @classmethod
-    def fetch_by_business_unit_id(cls, business_unit_id, on_or_after=None, before=None):
+    def fetch_by_business_unit_id(cls, business_unit_id, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
         conditions = ['businessUnitId={}'.format(business_unit_id)]
         if on_or_after:
             conditions.append('purchaseDate>=[{}]'.format(on_or_after))
         if before:
             conditions.append('purchaseDate<[{}]'.format(before))
 
-        return [cls(**product) for product in
-                Connectwise.submit_request('procurement/products', conditions)]
+        return [record_class(cls, compact, lazy)(**product) for product in
+                Connectwise.submit_request('procurement/products', conditions, fields=fields)]
 
     def billable_amount(self):
         if self.billableOption == 'Billable':
@@ -139,19 +159,11 @@ class Product:
     def total_cost(self):
         return Decimal(round(self.quantity * self.cost, 2))
 
-    def service_location(self, schedule_entries=[], tickets=[], activities=[]):
-        schedule_entry = [s.where['name'] for s in schedule_entries
-                          if s.dateStart[:10] == self.purchaseDate
-                          and s.objectId == self.chargeToId]
-        if schedule_entry: return schedule_entry[0]
-
-        ticket = [t.serviceLocation['name'] for t in tickets if t.id == self.chargeToId]
-        if ticket: return ticket[0]
-
-        activity = [a.where for a in activities if a.id == self.chargeToId]
-        if activity: return activity[0]
-
-        return 'On-Site'
+    def service_location(self, schedule_entries=[], tickets=[], activities=[], location_index=None):
+        """:param location_index: a ServiceLocationIndex to use instead of the lists"""
+        if location_index is None:
+            return ServiceLocationIndex.scan(self.chargeToId, self.purchaseDate, schedule_entries, tickets, activities)
+        return location_index.lookup(self.chargeToId, self.purchaseDate)
 
 
 class CatalogProduct:
@@ -163,35 +175,33 @@ class CatalogProduct:
         return "<Product {}>".format(self.identifier)
 
     @classmethod
-    def fetch_all(cls):
-        return [cls(**catalog_product) for catalog_product in Connectwise.submit_request('procurement/catalog')]
+    def fetch_all(cls, fields=None):
+        return [cls(**catalog_product) for catalog_product in Connectwise.submit_request('procurement/catalog', fields=fields)]
 
     @classmethod
-    def fetch_by_id(cls, _id):
-        conditions = ['id={}'.format(_id)]
-        return [cls(**catalog_product) for catalog_product in
-                Connectwise.submit_request('procurement/catalog', conditions)][0]
+    def fetch_by_id(cls, _id, fields=None):
+        return [cls(**catalog_product) for catalog_product in Connectwise.fetch_record('procurement/catalog', _id, fields=fields)][0]
 
     @classmethod
-    def fetch_by_description(cls, description):
+    def fetch_by_description(cls, description, fields=None):
         conditions = ['description contains "{}"'.format(description)]
         return [cls(**catalog_product) for catalog_product in
-                Connectwise.submit_request('procurement/catalog', conditions)]
+                Connectwise.submit_request('procurement/catalog', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_category_id(cls, category_id):
+    def fetch_by_category_id(cls, category_id, fields=None):
         conditions = ['category/id={}'.format(category_id)]
         return [cls(**catalog_product) for catalog_product in
-                Connectwise.submit_request('procurement/catalog', conditions)]
+                Connectwise.submit_request('procurement/catalog', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_subcategory_id(cls, subcategory_id):
+    def fetch_by_subcategory_id(cls, subcategory_id, fields=None, compact=False, lazy=False):
         conditions = ['subcategory/id={}'.format(subcategory_id)]
-        return [cls(**catalog_product) for catalog_product in
-                Connectwise.submit_request('procurement/catalog', conditions)]
+        return [record_class(cls, compact, lazy)(**catalog_product) for catalog_product in
+                Connectwise.submit_request('procurement/catalog', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_category_name(cls, category_name, operator='='):
+    def fetch_by_category_name(cls, category_name, operator='=', fields=None, compact=False, lazy=False):
         conditions = ['category/name {} "{}"'.format(operator, category_name)]
-        return [cls(**catalog_product) for catalog_product in
-                Connectwise.submit_request('procurement/catalog', conditions)]
+        return [record_class(cls, compact, lazy)(**catalog_product) for catalog_product in
+                Connectwise.submit_request('procurement/catalog', conditions, fields=fields)]
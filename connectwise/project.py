@@ -18,51 +18,50 @@ class Project:
         return "<Project {} - {}>".format(self.id, self.name)
 
     @classmethod
-    def fetch_all(cls):
-        return [cls(**project) for project in Connectwise.submit_request('project/projects')]
+    def fetch_all(cls, fields=None):
+        return [cls(**project) for project in Connectwise.submit_request('project/projects', fields=fields)]
 
     @classmethod
-    def fetch_by_est_start(cls, on_or_after=None, before=None):
+    def fetch_by_est_start(cls, on_or_after=None, before=None, fields=None):
         conditions = []
         if on_or_after:
             conditions.append('estimatedStart>=[{}]'.format(on_or_after))
         if before:
             conditions.append('estimatedStart<[{}]'.format(before))
-        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions)]
+        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_company_id(cls, company_id):
+    def fetch_by_company_id(cls, company_id, fields=None):
         conditions = 'company/id={}'.format(company_id)
-        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions)]
+        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_id(cls, _id):
-        conditions = 'id={}'.format(_id)
-        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions)][0]
+    def fetch_by_id(cls, _id, fields=None):
+        return [cls(**project) for project in Connectwise.fetch_record('project/projects', _id, fields=fields)][0]
 
     @classmethod
-    def fetch_by_business_unit_id(cls, business_unit_id):
+    def fetch_by_business_unit_id(cls, business_unit_id, fields=None):
         conditions = ['businessUnitId={}'.format(business_unit_id)]
-        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions)]
+        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_id_range(cls, low_id=None, high_id=None):
+    def fetch_by_id_range(cls, low_id=None, high_id=None, fields=None):
         conditions = []
         if low_id: conditions.append('id>={}'.format(low_id))
         if high_id: conditions.append('id<={}'.format(high_id))
-        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions)]
+        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_date_entered(cls, on_or_after=None, before=None):
+    def fetch_by_date_entered(cls, on_or_after=None, before=None, fields=None):
         project_ids = [p['PM_Project_RecID'] for p in
                        SystemReport.fetch_project_headers_by_date_entered(on_or_after, before)]
         if project_ids:
-            return cls.fetch_by_id_range(min(project_ids), max(project_ids))
+            return cls.fetch_by_id_range(min(project_ids), max(project_ids), fields)
 
     @classmethod
-    def fetch_by_conditions(cls, conditions):
+    def fetch_by_conditions(cls, conditions, fields=None):
         """Submit arbitrary conditions, like 'description contains "AutoTravel"' """
-        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions)]
+        return [cls(**project) for project in Connectwise.submit_request('project/projects', conditions, fields=fields)]
 
     def to_dict(self, include_self=False, tickets=[]):
         dict = {}
@@ -138,8 +137,8 @@ class Phase:
         return "<Phase {}>".format(self.description)
 
     @classmethod
-    def fetch_by_project_id(cls, project_id):
-        return [cls(**phase) for phase in Connectwise.submit_request('project/projects/{}/phases'.format(project_id))]
+    def fetch_by_project_id(cls, project_id, fields=None):
+        return [cls(**phase) for phase in Connectwise.submit_request('project/projects/{}/phases'.format(project_id), fields=fields)]
 
     def to_dict(self, include_self=False):
         project_dict = {}
@@ -0,0 +1,189 @@
+"""
+Compact, __slots__ based versions of the model classes, for holding large pulls in memory.
+
+A compact class is generated once per model. It has a slot for every field ConnectWise returns for
+that endpoint and every attribute the model sets itself, plus an overflow dict for anything else,
+and carries over all of the model's methods, so it works wherever the model does:
+
+    time_entries = TimeEntry.fetch_by_date_range('2017-07-01', '2018-07-01', compact=True)
+    time_entries[0].actual_days()
+
+Compact records are not instances of the model class (isinstance(entry, TimeEntry) is False).
+
+Lazy records are the other way round: a subclass of the model that keeps the raw record and only
+copies a field onto the object the first time it is read. They cost next to nothing to build, which
+suits large pulls where only a few fields get used:
+
+    time_entries = TimeEntry.fetch_by_date_range('2017-07-01', '2018-07-01', lazy=True)
+    sum(t.actualHours for t in time_entries)
+
+vars(), and so to_dict(), copies the rest of the record over first, so they see every field.
+
+Both are driven by two attributes declared on each model class:
+
+    RECORD_FIELDS: the fields ConnectWise returns for the model's endpoint plus the attributes the
+        model sets itself. Each gets a slot in the compact class; anything else goes to the overflow dict.
+    DERIVED_ATTRIBUTES: the attributes __init__ works out after copying the record over (Invoice.total),
+        which a lazy record can't read straight off the record. A model that doesn't declare it hydrates
+        on every miss, which is always correct, just slower.
+"""
+
+_compact_classes = {}
+_lazy_classes = {}
+
+
+class CompactRecord:
+    __slots__ = ('_extra',)
+
+    def __setattr__(self, name, value):
+        try:
+            object.__setattr__(self, name, value)
+        except AttributeError:
+            try:
+                extra = object.__getattribute__(self, '_extra')
+            except AttributeError:
+                extra = {}
+                object.__setattr__(self, '_extra', extra)
+            extra[name] = value
+
+    def __getattr__(self, name):
+        if name != '_extra':
+            try:
+                return self._extra[name]
+            except (AttributeError, KeyError):
+                pass
+        raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+
+    def __delattr__(self, name):
+        try:
+            object.__delattr__(self, name)
+        except AttributeError:
+            try:
+                del self._extra[name]
+            except (AttributeError, KeyError):
+                raise AttributeError(name)
+
+    @property
+    def __dict__(self):
+        """A new dict of the set attributes, so vars() and {**vars(self)} keep working (writes to it are lost)"""
+        attributes = {}
+        for name in type(self)._fields:
+            try:
+                attributes[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        try:
+            attributes.update(object.__getattribute__(self, '_extra'))
+        except AttributeError:
+            pass
+        return attributes
+
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def __reduce__(self):
+        return _new_record, (self._model, True, False), self.__getstate__()
+
+
+class LazyRecord:
+    """Mixed in ahead of the model class by lazy_class"""
+
+    def __init__(self, **record):
+        self._record = record
+
+    def __getattr__(self, name):
+        instance_dict = self._instance_dict()
+        record = instance_dict.get('_record')
+        if record is not None:
+            if self._derived is not None and name in record and name not in self._derived:
+                value = instance_dict[name] = record[name]
+                return value
+            # a default or something the model's __init__ works out from the record
+            self.hydrate()
+            if name in instance_dict:
+                return instance_dict[name]
+        raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+
+    def _instance_dict(self):
+        # the real instance dict, since __dict__ is overridden below
+        return type(self)._dict_descriptor.__get__(self)
+
+    def hydrate(self):
+        """Run the model's __init__ on the raw record, keeping anything set on the object since, and drop the record"""
+        instance_dict = self._instance_dict()
+        record = instance_dict.pop('_record', None)
+        if record is not None:
+            assigned = dict(instance_dict)
+            self._model.__init__(self, **record)
+            instance_dict.update(assigned)
+        return instance_dict
+
+    @property
+    def __dict__(self):
+        return self.hydrate()
+
+    def __reduce__(self):
+        # the raw record goes along unhydrated, so the copy stays lazy
+        return _new_record, (self._model, False, True), dict(self._instance_dict())
+
+    def __setstate__(self, state):
+        self._instance_dict().update(state)
+
+
+def compact_class(model):
+    """
+    The compact version of a model class, generated the first time it is asked for.
+    :param model: a model class such as TimeEntry
+    """
+    try:
+        return _compact_classes[model]
+    except KeyError:
+        pass
+    fields = tuple(dict.fromkeys(getattr(model, 'RECORD_FIELDS', ())))
+    namespace = {}
+    for klass in reversed(model.__mro__[:-1]):
+        namespace.update({name: value for name, value in vars(klass).items()
+                          if name not in ('__dict__', '__weakref__', '__slots__')})
+    namespace.update({'__slots__': fields, '_fields': fields, '_model': model,
+                      '__qualname__': 'Compact' + model.__qualname__})
+    _compact_classes[model] = type('Compact' + model.__name__, (CompactRecord,), namespace)
+    return _compact_classes[model]
+
+
+def lazy_class(model):
+    """
+    The lazy version of a model class, generated the first time it is asked for.
+    :param model: a model class such as TimeEntry
+    """
+    try:
+        return _lazy_classes[model]
+    except KeyError:
+        pass
+    dict_descriptor = next(vars(klass)['__dict__'] for klass in model.__mro__ if '__dict__' in vars(klass))
+    derived = getattr(model, 'DERIVED_ATTRIBUTES', None)
+    namespace = {'_model': model, '_derived': frozenset(derived) if derived is not None else None,
+                 '_dict_descriptor': dict_descriptor,
+                 '__qualname__': 'Lazy' + model.__qualname__, '__module__': model.__module__}
+    _lazy_classes[model] = type('Lazy' + model.__name__, (LazyRecord, model), namespace)
+    return _lazy_classes[model]
+
+
+def _new_record(model, compact=False, lazy=False):
+    """An empty record for pickle to fill in: generated classes can't be looked up by name, so rebuild them"""
+    cls = record_class(model, compact, lazy)
+    return cls.__new__(cls)
+
+
+def record_class(cls, compact=False, lazy=False):
+    """The class a fetcher should build its records with: cls, or its compact or lazy version"""
+    if compact and lazy:
+        raise ValueError('Records can be compact or lazy, not both')
+    if compact:
+        return compact_class(cls)
+    if lazy:
+        return lazy_class(cls)
+    return cls
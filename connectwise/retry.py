@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class RetryPolicy:
+    """
+    Decide whether a failed request should be retried and how long to wait first.
+    Waits grow exponentially with full jitter, unless the server sent a Retry-After header.
+    """
+
+    def __init__(self, max_retries=5, backoff_factor=0.5, max_backoff=60, statuses=(429, 500, 502, 503, 504),
+                 idempotent_methods=('GET', 'PUT', 'DELETE', 'HEAD')):
+        """
+        :param max_retries: number of retries after the first attempt
+        :param backoff_factor: base wait in seconds; attempt n waits up to backoff_factor * 2 ** n
+        :param max_backoff: upper bound in seconds for any single wait
+        :param statuses: HTTP status codes worth retrying
+        :param idempotent_methods: methods that are also retried on 5xx and connection errors.
+        Other methods are only retried on 429, which means the request was never processed. PATCH is left
+        out because ConnectWise PATCH bodies are JSON-Patch operations, and 'add' to an array applied twice
+        adds twice; pass idempotent_methods=('GET', 'PATCH', ...) to opt in for patches known to be safe
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.idempotent_methods = idempotent_methods
+
+    def should_retry(self, method, attempt, status_code=None):
+        """status_code of None means the request failed with a connection error or timeout"""
+        if attempt >= self.max_retries:
+            return False
+        if status_code == 429:
+            return True
+        if method.upper() not in self.idempotent_methods:
+            return False
+        return status_code is None or status_code in self.statuses
+
+    def backoff(self, attempt, retry_after=None):
+        retry_after = self.parse_retry_after(retry_after)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Retry-After is either a number of seconds or an HTTP date"""
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+class TokenBucket:
+    """
+    Thread-safe client-side rate limiter that adapts to server throttling: the rate is halved
+    every time the server answers 429 and creeps back up by `recovery` requests/second per success.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=0.5, recovery=0.1):
+        """
+        :param rate: starting and maximum rate in requests per second
+        :param capacity: burst size; defaults to one second's worth of requests
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return "<Token Bucket {:.2f}/s>".format(self.rate)
+
+    def reserve(self):
+        """Take a token and return how many seconds the caller must wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    def throttled(self):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery)
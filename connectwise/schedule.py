@@ -1,15 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from pprint import pprint
 
 from dateutil.relativedelta import relativedelta
 
-from lib.connectwise_py.connectwise.activity import Activity
 from lib.connectwise_py.connectwise.ticket import Ticket
 from lib.connectwise_py.connectwise.connectwise import Connectwise
+from lib.connectwise_py.connectwise.records import record_class
 from datetime import date, timedelta, datetime
 
 
 class ScheduleEntry:
+    RECORD_FIELDS = (
+        'id', 'objectId', 'name', 'member', 'where', 'dateStart', 'dateEnd', 'reminder', 'status', 'type', 'span',
+        'doneFlag', 'acknowledgedFlag', 'ownerFlag', 'meetingFlag', 'allowScheduleConflictsFlag',
+        'addMemberToProjectFlag', 'projectRoleId', 'mobileGuid', 'acknowledgedDate', 'closeDate', 'hours', '_info',
+    )
+    DERIVED_ATTRIBUTES = ()
+
     def __init__(self, id, **kwargs):
         self.id = id
         self.objectId = None
@@ -38,94 +46,121 @@ class ScheduleEntry:
         if include_self: schedule_dict['self'] = self
         return {**vars(self), **schedule_dict}
 
+    @staticmethod
+    def _date_start_conditions(on_or_after=None, before=None, conditions=None):
+        """conditions, plus dateStart bounds. Shared by the sync and async fetchers"""
+        conditions = list(conditions) if conditions else []
+        if on_or_after: conditions.append('dateStart>=[{}]'.format(on_or_after))
+        if before: conditions.append('dateStart<[{}]'.format(before))
+        return conditions
+
     @classmethod
-    def fetch_all(cls):
-        return [cls(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries')]
+    def fetch_all(cls, fields=None, compact=False, lazy=False):
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', fields=fields)]
 
     @classmethod
-    def fetch_by_object_ids(cls, object_ids, on_or_after=None, before=None):
-        # i = 1
-        # schedule_entries = []
-        # print(ticket_ids)
-        # while i < len(ticket_ids):
-        #     print(ticket_ids[i-1:10])
-        #     schedule_entries.extend(CWSchedule.fetch_by_object_ids(ticket_ids[i-1:10], on_or_after, before))
-        #     i += 10
-        # self.schedule_entries = schedule_entries
-        if len(object_ids) > 10:
-            raise IOError('Cannot lookup more than 10 objectIds at once')
-        conditions = ['({})'.format(
-            'objectId={}'.format(' or objectId='.join('{}'.format(_id) for _id in object_ids)))]
-        if on_or_after: conditions.append('dateStart>=[{}]'.format(on_or_after))
-        if before: conditions.append('dateStart<[{}]'.format(before))
-        return [cls(**schedule_entry) for schedule_entry in
-                Connectwise.submit_request('schedule/entries', conditions)]
+    def fetch_by_object_ids(cls, object_ids, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = cls._date_start_conditions(on_or_after, before)
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in
+                Connectwise.submit_chunked_request('schedule/entries', 'objectId', object_ids, conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_object_id(cls, object_id, on_or_after=None, before=None):
-        conditions = ['objectId={}'.format(object_id)]
-        if on_or_after: conditions.append('dateStart>=[{}]'.format(on_or_after))
-        if before: conditions.append('dateStart<[{}]'.format(before))
-        return [cls(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions)]
+    def fetch_by_object_id(cls, object_id, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = cls._date_start_conditions(on_or_after, before, ['objectId={}'.format(object_id)])
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_date_range(cls, on_or_after, before):
-        conditions = 'dateStart>=[{}] and dateStart<[{}]'.format(on_or_after, before)
-        return [cls(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions)]
+    async def fetch_by_object_id_async(cls, client, object_id, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = cls._date_start_conditions(on_or_after, before, ['objectId={}'.format(object_id)])
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in
+                await client.submit_request('schedule/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_this_fy(cls, member_identifier=None):
+    def fetch_by_date_range(cls, on_or_after, before, parallel=False, fields=None, compact=False, lazy=False):
+        conditions = cls._date_start_conditions(on_or_after, before)
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in
+                Connectwise.submit_request('schedule/entries', conditions, parallel=parallel, fields=fields)]
+
+    @classmethod
+    async def fetch_by_date_range_async(cls, client, on_or_after, before, fields=None, compact=False, lazy=False):
+        conditions = cls._date_start_conditions(on_or_after, before)
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in
+                await client.submit_request('schedule/entries', conditions, fields=fields)]
+
+    @classmethod
+    def iter_by_date_range(cls, on_or_after, before, fields=None, compact=False, lazy=False):
+        """Yield ScheduleEntries one page at a time instead of holding the whole range in memory"""
+        conditions = cls._date_start_conditions(on_or_after, before)
+        for schedule_entry in Connectwise.iter_request('schedule/entries', conditions, fields=fields):
+            yield record_class(cls, compact, lazy)(**schedule_entry)
+
+    @classmethod
+    def fetch_this_fy(cls, member_identifier=None, fields=None, compact=False, lazy=False):
         on_or_after, before = Connectwise.current_fy()
         conditions = 'dateStart>=[{}] and dateStart<[{}]'.format(on_or_after, before)
         if member_identifier: conditions += ' and member/identifier="{}"'.format(member_identifier)
-        return [cls(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_remaining_fy(cls):
+    def fetch_remaining_fy(cls, fields=None, compact=False, lazy=False):
         on_or_after, before = Connectwise.current_fy()
         on_or_after = date.today().strftime('%Y-%m-%d')
         conditions = 'dateStart>=[{}] and dateStart<[{}]'.format(on_or_after, before)
-        return [cls(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_upcoming(cls, days=30):
+    def fetch_upcoming(cls, days=30, fields=None, compact=False, lazy=False):
         on_or_after = date.today().strftime('%Y-%m-%d')
         before = date.today() + timedelta(days=days)
         conditions = 'dateStart>=[{}] and dateStart<[{}]'.format(on_or_after, before)
-        return [cls(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_upcoming_by_board_names(cls, board_names=[], days=30):
-        schedule_entries = cls.fetch_upcoming(days)
+    def fetch_upcoming_by_board_names(cls, board_names=[], days=30, fields=None, compact=False, lazy=False):
+        schedule_entries = cls.fetch_upcoming(days, fields, compact, lazy)
         ticket_ids = set([schedule_entry.objectId for schedule_entry in schedule_entries])
         tickets = Ticket.fetch_by_ids(ticket_ids)
         board_ticket_ids = [ticket.id for ticket in tickets if ticket.board['name'] in board_names]
         return [schedule_entry for schedule_entry in schedule_entries if schedule_entry.objectId in board_ticket_ids]
 
     @classmethod
-    def fetch_upcoming_by_project_ids(cls, project_ids=[], days=30):
-        schedule_entries = cls.fetch_upcoming(days)
+    def fetch_upcoming_by_project_ids(cls, project_ids=[], days=30, fields=None, compact=False, lazy=False):
+        schedule_entries = cls.fetch_upcoming(days, fields, compact, lazy)
         ticket_ids = set([schedule_entry.objectId for schedule_entry in schedule_entries])
         tickets = Ticket.fetch_by_ids(ticket_ids)
         project_ticket_ids = [ticket.id for ticket in tickets if ticket.project and ticket.project['id'] in project_ids]
         return [schedule_entry for schedule_entry in schedule_entries if schedule_entry.objectId in project_ticket_ids]
 
     @classmethod
-    def fetch_by_company_id(cls, company_id, on_or_after=None, before=None):
+    def fetch_by_company_id(cls, company_id, on_or_after=None, before=None, deadline=None, fields=None, compact=False, lazy=False):
+        """
+        Schedule entries for the company itself and for any of its Tickets or Activities. The company's
+        Ticket and Activity ids are fetched concurrently, then only the schedule entries on those ids are
+        requested, in as few '(objectId=a or objectId=b ...)' queries as fit, run concurrently.
+        :param deadline: optional time budget in seconds shared by every query this method makes
+        """
         conditions = []
         if on_or_after:
             conditions.append('dateStart>=[{}]'.format(on_or_after))
         if before:
             conditions.append('dateStart<[{}]'.format(before))
         conditions = ' and '.join(conditions)
-        company_tickets = Ticket.fetch_by_company_id(company_id)
-        company_activities = Activity.fetch_by_company_id(company_id)
-        schedule_entries = [cls(**schedule_entry) for schedule_entry in Connectwise.submit_request('schedule/entries', conditions)]
-        return [s for s in schedule_entries
-                if s.objectId == company_id or
-                s.objectId in [ticket.id for ticket in company_tickets] or
-                s.objectId in [activity.id for activity in company_activities]
-                ]
+        with Connectwise.deadline(deadline) as budget:
+
+            def fetch_ids(endpoint):
+                with Connectwise.deadline(budget.remaining() if budget else None):
+                    return {record['id'] for record in
+                            Connectwise.submit_request(endpoint, 'company/id={}'.format(company_id), fields=['id'])}
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                ticket_ids = executor.submit(fetch_ids, 'service/tickets')
+                activity_ids = executor.submit(fetch_ids, 'sales/activities')
+                object_ids = {company_id} | ticket_ids.result() | activity_ids.result()
+            schedule_entries = Connectwise.submit_chunked_request('schedule/entries', 'objectId', sorted(object_ids),
+                                                                  conditions, fields=fields)
+        schedule_entries.sort(key=lambda schedule_entry: schedule_entry['id'])
+        return [record_class(cls, compact, lazy)(**schedule_entry) for schedule_entry in schedule_entries
+                if schedule_entry.get('objectId') in object_ids]
 
     def days(self):
         return Decimal(round(self.hours / 8, 2))
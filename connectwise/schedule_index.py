@@ -0,0 +1,88 @@
+from bisect import bisect_left, bisect_right
+
+
+class ScheduleIndex:
+    """
+    Finds the schedule entry a Time Entry was scheduled under (same objectId and member, and a dateStart
+    to dateEnd range containing the Time Entry) without scanning every schedule entry. Entries are
+    grouped on (objectId, member identifier) and sorted by dateStart, so the entries that start early
+    enough are a prefix of the group. Each prefix is covered by O(log n) blocks of a Fenwick tree, and
+    each block keeps its entries sorted by dateEnd with the running minimum list position from the end,
+    so a lookup is O(log² n) bisects whatever the entries look like.
+    Where several schedule entries match, the first one in the list wins, as it does when scanning it.
+    Schedule entries without a dateStart or dateEnd can't contain anything, and are left out.
+
+        index = ScheduleIndex(schedule_entries)
+        for time_entry, schedule_entry in index.join(time_entries):
+            ...
+    """
+
+    def __init__(self, schedule_entries):
+        groups = {}
+        for position, schedule_entry in enumerate(schedule_entries):
+            if schedule_entry.dateStart is None or schedule_entry.dateEnd is None:
+                continue
+            key = (schedule_entry.objectId, schedule_entry.member['identifier'])
+            groups.setdefault(key, []).append((schedule_entry.dateStart, position, schedule_entry))
+        self.groups = {}
+        for key, group in groups.items():
+            group.sort(key=lambda item: item[:2])
+            self.groups[key] = ([date_start for date_start, _, _ in group], self._tree(group))
+
+    def __repr__(self):
+        return "<Schedule Index {} groups>".format(len(self.groups))
+
+    @staticmethod
+    def _tree(group):
+        """
+        Fenwick tree over group (sorted by dateStart): node i covers group[i - (i & -i):i], as its dateEnds
+        in order and, for each, the (position, schedule entry) with the lowest position from there on
+        """
+        tree = [None]
+        for i in range(1, len(group) + 1):
+            block = sorted(((s.dateEnd, position, s) for _, position, s in group[i - (i & -i):i]),
+                           key=lambda item: item[:2])
+            firsts = []
+            for date_end, position, s in reversed(block):
+                firsts.append((position, s) if not firsts or position < firsts[-1][0] else firsts[-1])
+            firsts.reverse()
+            tree.append(([date_end for date_end, _, _ in block], firsts))
+        return tree
+
+    def find(self, object_id, member_identifier, time_start, time_end):
+        """The first schedule entry for object_id and member_identifier whose range contains time_start to time_end"""
+        group = self.groups.get((object_id, member_identifier))
+        if group is None or time_start is None or time_end is None:
+            return None
+        date_starts, tree = group
+        found = None
+        # dateStart <= time_start for everything before i
+        i = bisect_right(date_starts, time_start)
+        while i:
+            date_ends, firsts = tree[i]
+            k = bisect_left(date_ends, time_end)
+            if k < len(date_ends) and (found is None or firsts[k][0] < found[0]):
+                found = firsts[k]
+            i -= i & -i
+        return found[1] if found else None
+
+    @staticmethod
+    def scan(schedule_entries, object_id, member_identifier, time_start, time_end):
+        """find for a single lookup, straight off the list: cheaper than building an index for one lookup"""
+        if time_start is None or time_end is None:
+            return None
+        for s in schedule_entries:
+            if s.objectId == object_id and s.member['identifier'] == member_identifier and \
+                    s.dateStart is not None and s.dateEnd is not None and \
+                    s.dateStart <= time_start and s.dateEnd >= time_end:
+                return s
+        return None
+
+    def schedule_entry(self, time_entry):
+        """The schedule entry time_entry was scheduled under, or None"""
+        return self.find(time_entry.chargeToId, time_entry.member['identifier'], time_entry.timeStart,
+                         time_entry.timeEnd)
+
+    def join(self, time_entries):
+        """Pair every Time Entry with its schedule entry, or None. Returns a list of (time_entry, schedule_entry)"""
+        return [(time_entry, self.schedule_entry(time_entry)) for time_entry in time_entries]
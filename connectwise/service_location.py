@@ -0,0 +1,55 @@
+class ServiceLocationIndex:
+    """
+    Answers TimeEntry.service_location and Product.service_location with dict lookups: schedule entries
+    are indexed on (date, objectId), Tickets and Activities on id. Where several records match, the
+    first one in its list wins, as it does when scanning the lists.
+
+        index = ServiceLocationIndex(schedule_entries, tickets, activities)
+        locations = index.service_locations(time_entries)
+    """
+
+    def __init__(self, schedule_entries=[], tickets=[], activities=[]):
+        self.schedule_entries = {}
+        self.tickets = {}
+        self.activities = {}
+        for schedule_entry in schedule_entries:
+            self.schedule_entries.setdefault((schedule_entry.dateStart[:10], schedule_entry.objectId),
+                                             schedule_entry.where['name'])
+        for ticket in tickets:
+            if getattr(ticket, 'serviceLocation', None):
+                self.tickets.setdefault(ticket.id, ticket.serviceLocation['name'])
+        for activity in activities:
+            if hasattr(activity, 'where'):
+                self.activities.setdefault(activity.id, activity.where)
+
+    def __repr__(self):
+        return "<Service Location Index {} schedule entries, {} tickets, {} activities>".format(
+            len(self.schedule_entries), len(self.tickets), len(self.activities))
+
+    def lookup(self, charge_to_id, on_date):
+        """
+        The service location of whatever charge_to_id is on on_date ('YYYY-MM-DD'): where it was scheduled
+        that day, else the Ticket's service location, else the Activity's where, else 'On-Site'
+        """
+        if (on_date, charge_to_id) in self.schedule_entries: return self.schedule_entries[(on_date, charge_to_id)]
+        if charge_to_id in self.tickets: return self.tickets[charge_to_id]
+        if charge_to_id in self.activities: return self.activities[charge_to_id]
+        return 'On-Site'
+
+    @staticmethod
+    def scan(charge_to_id, on_date, schedule_entries=[], tickets=[], activities=[]):
+        """lookup for a single entry, straight off the lists: cheaper than building an index for one lookup"""
+        for schedule_entry in schedule_entries:
+            if schedule_entry.objectId == charge_to_id and schedule_entry.dateStart[:10] == on_date:
+                return schedule_entry.where['name']
+        for ticket in tickets:
+            if ticket.id == charge_to_id and getattr(ticket, 'serviceLocation', None):
+                return ticket.serviceLocation['name']
+        for activity in activities:
+            if activity.id == charge_to_id and hasattr(activity, 'where'):
+                return activity.where
+        return 'On-Site'
+
+    def service_locations(self, entries):
+        """service_location of every Time Entry and/or Product in entries, in the same order"""
+        return [entry.service_location(location_index=self) for entry in entries]
@@ -0,0 +1,134 @@
+import importlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from .connectwise import Connectwise
+
+
+class MemoryStore:
+    """
+    Keeps the latest version of every synced record in memory, keyed by endpoint and id, along
+    with each endpoint's lastUpdated watermark. Pass a path to persist both between runs as JSON.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.data = {}
+        self.watermarks = {}
+        self.synced_at = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            self.data = {endpoint: {record['id']: record for record in records}
+                         for endpoint, records in saved['data'].items()}
+            self.watermarks = saved['watermarks']
+
+    def __repr__(self):
+        return "<Memory Store {}>".format(', '.join('{} {}'.format(k, len(v)) for k, v in self.data.items()))
+
+    def upsert(self, endpoint, records):
+        table = self.data.setdefault(endpoint, {})
+        for record in records:
+            table[record['id']] = record
+
+    def records(self, endpoint):
+        return list(self.data.get(endpoint, {}).values())
+
+    def get_watermark(self, endpoint):
+        return self.watermarks.get(endpoint)
+
+    def set_watermark(self, endpoint, watermark):
+        self.watermarks[endpoint] = watermark
+        self.save()
+
+    def mark_synced(self, endpoint):
+        self.synced_at[endpoint] = time.time()
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump({'data': {k: list(v.values()) for k, v in self.data.items()}, 'watermarks': self.watermarks}, f)
+        os.replace(self.path + '.tmp', self.path)
+
+
+class DeltaSync:
+    """
+    Pull only the records changed since the last run, per endpoint, and merge them into a store.
+
+        sync = DeltaSync(MemoryStore('cw_sync.json'))
+        sync.sync('time_entries', since='2017-07-01')   # first run pulls everything since the FY start
+        sync.sync('time_entries')                       # later runs only pull what changed
+        time_entries = sync.objects('time_entries')
+
+    The watermark only moves forward once an endpoint has been fully synced, so an interrupted run
+    is simply repeated. It is set to the time the run started, less overlap seconds to allow for clock
+    skew, rather than to the newest lastUpdated seen: pages are not read atomically, so a record updated
+    mid-run can land on a page that was already read. Records in the overlap are fetched again next run.
+    Records deleted in Connectwise are not detected by lastUpdated.
+    """
+    # name: (endpoint, condition field, model module, model class)
+    ENTITIES = {
+        'tickets': ('service/tickets', 'lastUpdated', 'ticket', 'Ticket'),
+        'time_entries': ('time/entries', '_info/lastUpdated', 'time_entry', 'TimeEntry'),
+        'schedule_entries': ('schedule/entries', '_info/lastUpdated', 'schedule', 'ScheduleEntry'),
+        'expense_entries': ('expense/entries', '_info/lastUpdated', 'expense', 'ExpenseEntry'),
+        'products': ('procurement/products', 'lastUpdated', 'product', 'Product'),
+        'projects': ('project/projects', '_info/lastUpdated', 'project', 'Project'),
+        'companies': ('company/companies', '_info/lastUpdated', 'company', 'Company'),
+        'contacts': ('company/contacts', '_info/lastUpdated', 'contact', 'Contact'),
+    }
+
+    def __init__(self, store=None, batch_size=1000, overlap=300):
+        """
+        :param overlap: seconds the next run reaches back before this run's start, to allow for the
+        difference between the local clock and Connectwise's
+        """
+        self.store = store if store is not None else MemoryStore()
+        self.batch_size = batch_size
+        self.overlap = overlap
+
+    def __repr__(self):
+        return "<Delta Sync {}>".format(self.store)
+
+    def sync_all(self, since=None):
+        return {name: self.sync(name, since) for name in self.ENTITIES}
+
+    def sync(self, name, since=None):
+        """
+        Fetch the records of one entity changed since its watermark and merge them into the store.
+        Whole records are always fetched, since they replace what the store holds.
+        :param since: date or timestamp to start from when the entity has never been synced
+        :return: the number of records fetched
+        """
+        endpoint, field = self.ENTITIES[name][:2]
+        watermark = self.store.get_watermark(endpoint) or since
+        conditions = ['{}>=[{}]'.format(field, watermark)] if watermark else []
+        started = datetime.now(timezone.utc) - timedelta(seconds=self.overlap)
+
+        count = 0
+        batch = []
+        for record in Connectwise.iter_request(endpoint, conditions):
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self.store.upsert(endpoint, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.store.upsert(endpoint, batch)
+            count += len(batch)
+
+        new_watermark = started.strftime('%Y-%m-%dT%H:%M:%SZ')
+        if not watermark or new_watermark > watermark:
+            self.store.set_watermark(endpoint, new_watermark)
+        # the store is current even when nothing changed
+        self.store.mark_synced(endpoint)
+        return count
+
+    def objects(self, name):
+        """Build model objects from everything synced so far for one entity"""
+        endpoint, field, module, class_name = self.ENTITIES[name]
+        cls = getattr(importlib.import_module('.' + module, __package__), class_name)
+        return [cls(**record) for record in self.store.records(endpoint)]
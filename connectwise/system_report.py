@@ -100,6 +100,73 @@ class TimeReport(SystemReport):
         return [cls(**report, name=cls.name) for report in cls.fetch(cls.name, conditions)]
 
 
+class TimeReportIndex:
+    """
+    TimeReport rows keyed by Time_RecID, for attaching them to many Time Entries at once.
+    Rows that were not supplied can be fetched in batched '(Time_RecID=a or Time_RecID=b ...)' queries.
+
+        index = TimeReportIndex(TimeReport.fetch_by_date_range('2017-07-01', '2018-07-01'))
+        index.attach(time_entries, fetch_if_not_found=True)
+        index.stats()
+    """
+
+    def __init__(self, system_reports=[]):
+        self.reports = {}
+        self.missing = set()
+        self._not_found = set()
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+        self.add(system_reports)
+
+    def __repr__(self):
+        return "<Time Report Index {} reports, {} hits, {} misses>".format(len(self.reports), self.hits, self.misses)
+
+    def __len__(self):
+        return len(self.reports)
+
+    def add(self, system_reports):
+        for report in system_reports:
+            self.reports.setdefault(report.Time_RecID, report)
+            self.missing.discard(report.Time_RecID)
+
+    def fetch_missing(self, time_entry_ids):
+        """Fetch the rows for whichever of time_entry_ids are not in the index yet, in batches"""
+        ids = sorted(set(_id for _id in time_entry_ids if _id is not None) - set(self.reports) - self._not_found)
+        if not ids:
+            return
+        reports = [TimeReport(**time, name=TimeReport.name) for time in Connectwise.submit_chunked_request(
+            'system/reports/{}'.format(TimeReport.name), 'Time_RecID', ids, unique_key='Time_RecID')]
+        self.fetched += len(reports)
+        self.add(reports)
+        self._not_found.update(_id for _id in ids if _id not in self.reports)
+
+    def get(self, time_entry_id):
+        report = self.reports.get(time_entry_id)
+        if report is None:
+            self.misses += 1
+            self.missing.add(time_entry_id)
+        else:
+            self.hits += 1
+        return report
+
+    def attach(self, time_entries, fetch_if_not_found=False):
+        """
+        Set system_report on every Time Entry in time_entries that has a row, like fetch_system_report.
+        :param fetch_if_not_found: fetch the rows that are not in the index first, in batches
+        :return: stats(), whose 'missing' lists the Time Entry ids without a row
+        """
+        if fetch_if_not_found:
+            self.fetch_missing(t.id for t in time_entries)
+        for time_entry in time_entries:
+            time_entry.fetch_system_report(report_index=self)
+        return self.stats()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'fetched': self.fetched, 'size': len(self.reports),
+                'missing': sorted(self.missing)}
+
+
 class SystemReportExpense(SystemReport):
     name = 'Expense'
     date_field = 'Date_Expense'
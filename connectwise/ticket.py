@@ -2,9 +2,25 @@ import datetime
 from decimal import Decimal
 
 from .connectwise import Connectwise
+from .records import record_class
 
 
 class Ticket:
+    RECORD_FIELDS = (
+        'id', 'summary', 'recordType', 'board', 'status', 'project', 'phase', 'wbsCode', 'company', 'siteName',
+        'addressLine1', 'addressLine2', 'city', 'stateIdentifier', 'zip', 'contact', 'contactName',
+        'contactPhoneNumber', 'contactEmailAddress', 'type', 'subType', 'item', 'owner', 'priority',
+        'serviceLocation', 'source', 'agreement', 'severity', 'impact', 'allowAllClientsPortalView',
+        'customerUpdatedFlag', 'automaticEmailContactFlag', 'automaticEmailResourceFlag', 'automaticEmailCcFlag',
+        'closedDate', 'closedBy', 'closedFlag', 'actualHours', 'approved', 'estimatedExpenseCost',
+        'estimatedExpenseRevenue', 'estimatedProductCost', 'estimatedProductRevenue', 'estimatedTimeCost',
+        'estimatedTimeRevenue', 'billingMethod', 'subBillingMethod', 'resolveMinutes', 'resPlanMinutes',
+        'respondMinutes', 'isInSla', 'hasChildTicket', 'billTime', 'billExpenses', 'billProducts', 'location',
+        'department', 'mobileGuid', 'budgetHours', 'resources', 'requiredDate', 'estimatedStartDate', 'dateEntered',
+        'customFields', '_info', 'schedule_entries', 'time_entries', 'expense_entries', 'notes',
+    )
+    DERIVED_ATTRIBUTES = ()
+
     def __init__(self, id, summary, **kwargs):
         self.id = id
         self.summary = summary
@@ -39,80 +55,122 @@ class Ticket:
         if include_self: ticket_dict['self'] = self
         return {**vars(self), **ticket_dict}
 
+    @staticmethod
+    def _ids_conditions(ids):
+        """Conditions shared by the sync and async fetchers"""
+        return 'id={}'.format(' or id='.join('{}'.format(_id) for _id in ids))
+
+    @staticmethod
+    def _company_conditions(company_id):
+        return 'company/id={}'.format(company_id)
+
     @classmethod
-    def fetch_by_id(cls, id):
-        conditions = 'id={}'.format(id)
-        ticket = Connectwise.submit_request('service/tickets', conditions)
+    def fetch_by_id(cls, id, fields=None, compact=False, lazy=False):
+        ticket = Connectwise.fetch_record('service/tickets', id, fields=fields)
         if len(ticket) > 0:
             ticket = ticket[0]
-            return cls(**ticket)
+            return record_class(cls, compact, lazy)(**ticket)
         return None
 
     @classmethod
-    def fetch_by_ids(cls, ids):
-        conditions = 'id={}'.format(' or id='.join('{}'.format(_id) for _id in ids))
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets/search', conditions, verb='POST')]
+    async def fetch_by_id_async(cls, client, id, fields=None, compact=False, lazy=False):
+        conditions = Connectwise.condition('id', id)
+        ticket = await client.submit_request('service/tickets', conditions, fields=fields)
+        if len(ticket) > 0:
+            ticket = ticket[0]
+            return record_class(cls, compact, lazy)(**ticket)
+        return None
+
+    @classmethod
+    def fetch_by_ids(cls, ids, fields=None, compact=False, lazy=False):
+        conditions = cls._ids_conditions(ids)
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets/search', conditions, verb='POST', fields=fields)]
 
     @classmethod
-    def fetch_by_project_id(cls, project_id):
+    async def fetch_by_ids_async(cls, client, ids, fields=None, compact=False, lazy=False):
+        conditions = cls._ids_conditions(ids)
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in
+                await client.submit_request('service/tickets/search', conditions, verb='POST', fields=fields)]
+
+    @classmethod
+    def fetch_by_project_id(cls, project_id, fields=None, compact=False, lazy=False):
         conditions = 'project/id={}'.format(project_id)
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_type_id(cls, type_id):
+    def fetch_by_type_id(cls, type_id, fields=None, compact=False, lazy=False):
         conditions = 'type/id={}'.format(type_id)
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_type_name(cls, type_name):
+    def fetch_by_type_name(cls, type_name, fields=None, compact=False, lazy=False):
         conditions = 'type/name="{}"'.format(type_name)
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
 
     @classmethod
-    def fetch_pd_tickets(cls):
+    def fetch_pd_tickets(cls, fields=None, compact=False, lazy=False):
         conditions = 'type/name="{}"'.format('Professional Development')
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
 
     @classmethod
-    def fetch_pd_tickets_by_member_identifier(cls, member_identifier):
+    def fetch_pd_tickets_by_member_identifier(cls, member_identifier, fields=None, compact=False, lazy=False):
         conditions = 'type/name="{}" and member/identifier="{}"'.format('Professional Development', member_identifier)
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_board_names(cls, board_names=[], on_or_after=None, before=None):
+    def fetch_by_board_names(cls, board_names=[], on_or_after=None, before=None, fields=None, compact=False, lazy=False):
         conditions = ['board/name="' + '" or board/name="'.join(board_names) + '"']
         if on_or_after: conditions.append('estimatedStartDate>=[{}]'.format(on_or_after))
         if before: conditions.append('estimatedStartDate<[{}]'.format(before))
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_business_unit_id(cls, business_unit_id):
+    def fetch_by_business_unit_id(cls, business_unit_id, fields=None, compact=False, lazy=False):
         conditions = 'businessUnitId={}'.format(business_unit_id)
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_member_identifier(cls, member_identifier):
+    def fetch_by_member_identifier(cls, member_identifier, fields=None, compact=False, lazy=False):
         conditions = 'resources contains "{}"'.format(member_identifier)
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_last_updated(cls, on_or_after):
+    def fetch_by_last_updated(cls, on_or_after, fields=None, compact=False, lazy=False):
         conditions = 'lastUpdated>=[{}]'.format(on_or_after)
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
+
+    @classmethod
+    def fetch_by_company_id(cls, company_id, fields=None, compact=False, lazy=False):
+        conditions = cls._company_conditions(company_id)
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
+
+    @classmethod
+    async def fetch_by_company_id_async(cls, client, company_id, fields=None, compact=False, lazy=False):
+        conditions = cls._company_conditions(company_id)
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in await client.submit_request('service/tickets', conditions, fields=fields)]
+
+    @classmethod
+    def fetch_all(cls, parallel=False, fields=None, compact=False, lazy=False):
+        if parallel:
+            return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', parallel=parallel, fields=fields)]
+        return list(cls.iter_all(fields, compact, lazy))
 
     @classmethod
-    def fetch_by_company_id(cls, company_id):
-        conditions = 'company/id={}'.format(company_id)
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+    def iter_all(cls, fields=None, compact=False, lazy=False):
+        """Yield every Ticket one page at a time instead of holding all raw records in memory"""
+        for ticket in Connectwise.iter_request('service/tickets', fields=fields):
+            yield record_class(cls, compact, lazy)(**ticket)
 
     @classmethod
-    def fetch_all(cls):
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets')]
+    def iter_by_last_updated(cls, on_or_after, fields=None, compact=False, lazy=False):
+        conditions = 'lastUpdated>=[{}]'.format(on_or_after)
+        for ticket in Connectwise.iter_request('service/tickets', conditions, fields=fields):
+            yield record_class(cls, compact, lazy)(**ticket)
 
     @classmethod
-    def fetch_by_record_type(cls, record_type):
+    def fetch_by_record_type(cls, record_type, fields=None, compact=False, lazy=False):
         conditions = 'recordType="{}"'.format(record_type)
-        return [cls(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions)]
+        return [record_class(cls, compact, lazy)(**ticket) for ticket in Connectwise.submit_request('service/tickets', conditions, fields=fields)]
 
     def fetch_notes(self, include_internal_analysis=False, include_detail_description=True):
         return [note for note in Connectwise.submit_request('service/tickets/{}/notes'.format(self.id))
@@ -1,10 +1,23 @@
 from decimal import Decimal
-from lib.connectwise_py.connectwise.member import Member
-from lib.connectwise_py.connectwise.system_report import TimeReport
+from lib.connectwise_py.connectwise.member import Member, MemberRegistry
+from lib.connectwise_py.connectwise.system_report import TimeReport, TimeReportIndex
 from .connectwise import Connectwise
+from .records import record_class
+from .schedule_index import ScheduleIndex
+from .service_location import ServiceLocationIndex
 
 
 class TimeEntry:
+    RECORD_FIELDS = (
+        'id', 'company', 'chargeToId', 'chargeToType', 'member', 'locationId', 'businessUnitId', 'workType',
+        'workRole', 'agreement', 'timeStart', 'timeEnd', 'hoursDeduct', 'actualHours', 'billableOption', 'notes',
+        'internalNotes', 'addToDetailDescriptionFlag', 'addToInternalAnalysisFlag', 'addToResolutionFlag',
+        'emailResourceFlag', 'emailContactFlag', 'emailCcFlag', 'hoursBilled', 'enteredBy', 'dateEntered', 'invoice',
+        'mobileGuid', 'hourlyRate', 'timeSheet', 'status', 'ticket', 'project', 'phase', 'customFields', '_info',
+        'estHourlyCost', 'estCost', 'system_report',
+    )
+    DERIVED_ATTRIBUTES = ()
+
     def __init__(self, **kwargs):
         self.id = None
         self.chargeToId = None
@@ -21,7 +34,8 @@ class TimeEntry:
     def __repr__(self):
         return "<Time Entry {}>".format(self.chargeToId)
 
-    def to_dict(self, include_self=False, schedule_entries=[], tickets=[], activities=[], members=[], system_reports=[]):
+    def to_dict(self, include_self=False, schedule_entries=[], tickets=[], activities=[], members=[], system_reports=[],
+                location_index=None, member_registry=None, report_index=None):
         """
         Get a representation of the TimeEntry object as a Python Dictionary,
         including calculated values from methods.
@@ -32,110 +46,137 @@ class TimeEntry:
 
         :param include_self: when True, include the original object under the dictionary
         key 'self' so that you have it in case you need to reference it later
+        :param location_index: a ServiceLocationIndex of schedule_entries, tickets and activities
+        :param member_registry: a MemberRegistry of members
+        :param report_index: a TimeReportIndex of system_reports
         """
         dict = {}
         dict['actual_days'] = self.actual_days()
         dict['daily_rate'] = self.daily_rate()
         dict['billable_amount'] = self.billable_amount()
-        if members: dict['estimated_cost'] = self.fetch_estimated_cost(members, fetch_if_not_found=False)
+        if members: dict['estimated_cost'] = self.fetch_estimated_cost(members, fetch_if_not_found=False,
+                                                                        member_registry=member_registry)
         if schedule_entries or tickets or activities:
-            dict['service_location'] = self.service_location(schedule_entries, tickets, activities)
+            dict['service_location'] = self.service_location(schedule_entries, tickets, activities, location_index)
         if system_reports:
-            dict['system_report'] = self.fetch_system_report(system_reports, fetch_if_not_found=False)
+            dict['system_report'] = self.fetch_system_report(system_reports, fetch_if_not_found=False,
+                                                             report_index=report_index)
             if self.system_report:
                 dict['estimated_cost'] = self.actualHours * self.system_report.Hourly_Cost_Decimal
         if include_self: dict['self'] = self
         return {**vars(self), **dict}
 
-    @classmethod
-    def fetch_by_member_identifier(cls, member_identifier, on_or_after=None, before=None):
-        conditions = ['member/identifier="{}"'.format(member_identifier)]
+    @staticmethod
+    def to_dicts(time_entries, include_self=False, schedule_entries=[], tickets=[], activities=[], members=[],
+                 system_reports=[]):
+        """to_dict of every Time Entry in time_entries, indexing the related lists once rather than per entry"""
+        location_index = ServiceLocationIndex(schedule_entries, tickets, activities)
+        member_registry = MemberRegistry(members)
+        report_index = TimeReportIndex(system_reports)
+        return [time_entry.to_dict(include_self, schedule_entries, tickets, activities, members, system_reports,
+                                   location_index, member_registry, report_index) for time_entry in time_entries]
+
+    @staticmethod
+    def _time_start_conditions(on_or_after=None, before=None, conditions=None):
+        """conditions, plus timeStart bounds. Shared by the sync and async fetchers"""
+        conditions = list(conditions) if conditions else []
         if on_or_after:
             conditions.append('timeStart>=[{}]'.format(on_or_after))
         if before:
             conditions.append('timeStart<[{}]'.format(before))
-        return [cls(**time_entry) for time_entry in Connectwise.submit_request('time/entries', conditions)]
+        return conditions
+
+    @staticmethod
+    def _charge_to_conditions(charge_to_id, charge_to_type=None):
+        conditions = ['chargeToId={}'.format(charge_to_id)]
+        if charge_to_type: conditions.append('chargeToType="{}"'.format(charge_to_type))
+        return conditions
 
     @classmethod
-    def fetch_vacation_by_member_identifier(cls, member_identifier):
+    def fetch_by_member_identifier(cls, member_identifier, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = cls._time_start_conditions(on_or_after, before, ['member/identifier="{}"'.format(member_identifier)])
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in Connectwise.submit_request('time/entries', conditions, fields=fields)]
+
+    @classmethod
+    async def fetch_by_member_identifier_async(cls, client, member_identifier, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = cls._time_start_conditions(on_or_after, before, ['member/identifier="{}"'.format(member_identifier)])
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in await client.submit_request('time/entries', conditions, fields=fields)]
+
+    @classmethod
+    def fetch_vacation_by_member_identifier(cls, member_identifier, fields=None, compact=False, lazy=False):
         conditions = ['member/identifier="{}"'.format(member_identifier), 'workType/id=7']  # Vacation work type
-        return [cls(**time_entry) for time_entry in Connectwise.submit_request('time/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in Connectwise.submit_request('time/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_pd(cls):
+    def fetch_pd(cls, fields=None, compact=False, lazy=False):
         conditions = ['workType/id=29']  # PD work type
-        return [cls(**time_entry) for time_entry in Connectwise.submit_request('time/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in Connectwise.submit_request('time/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_pd_by_member_identifier(cls, member_identifier):
+    def fetch_pd_by_member_identifier(cls, member_identifier, fields=None, compact=False, lazy=False):
         conditions = ['member/identifier="{}"'.format(member_identifier), 'workType/id=29']  # PD work type
-        return [cls(**time_entry) for time_entry in Connectwise.submit_request('time/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in Connectwise.submit_request('time/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_date_range(cls, on_or_after=None, before=None, fields=None):
-        conditions = []
-        if on_or_after:
-            conditions.append('timeStart>=[{}]'.format(on_or_after))
-        if before:
-            conditions.append('timeStart<[{}]'.format(before))
+    def fetch_by_date_range(cls, on_or_after=None, before=None, fields=None, parallel=False, compact=False, lazy=False):
+        conditions = cls._time_start_conditions(on_or_after, before)
 
-        return [cls(**time_entry) for time_entry in
-                Connectwise.submit_request('time/entries', conditions, fields=fields)]
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in
+                Connectwise.submit_request('time/entries', conditions, fields=fields, parallel=parallel)]
 
     @classmethod
-    def fetch_by_company_id(cls, company_id, on_or_after=None, before=None):
-        conditions = ['company/id={}'.format(company_id)]
-        if on_or_after:
-            conditions.append('timeStart>=[{}]'.format(on_or_after))
-        if before:
-            conditions.append('timeStart<[{}]'.format(before))
+    async def fetch_by_date_range_async(cls, client, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = cls._time_start_conditions(on_or_after, before)
 
-        return [cls(**time_entry) for time_entry in
-                Connectwise.submit_request('time/entries', conditions)]
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in
+                await client.submit_request('time/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_business_unit_id(cls, business_unit_id, on_or_after=None, before=None):
-        conditions = ['businessUnitId={}'.format(business_unit_id)]
-        if on_or_after:
-            conditions.append('timeStart>=[{}]'.format(on_or_after))
-        if before:
-            conditions.append('timeStart<[{}]'.format(before))
+    def iter_by_date_range(cls, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        """Yield TimeEntries one page at a time instead of holding the whole range in memory"""
+        conditions = cls._time_start_conditions(on_or_after, before)
 
-        return [cls(**time_entry) for time_entry in
-                        Connectwise.submit_request('time/entries', conditions)]
+        for time_entry in Connectwise.iter_request('time/entries', conditions, fields=fields):
+            yield record_class(cls, compact, lazy)(**time_entry)
 
     @classmethod
-    def fetch_by_charge_to_id(cls, charge_to_id, charge_to_type=None):
-        conditions = ['chargeToId={}'.format(charge_to_id)]
-        if charge_to_type: conditions.append('chargeToType="{}"'.format(charge_to_type))
-        return [cls(**time_entry) for time_entry in
-                Connectwise.submit_request('time/entries', conditions)]
+    def fetch_by_company_id(cls, company_id, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = cls._time_start_conditions(on_or_after, before, ['company/id={}'.format(company_id)])
+
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in
+                Connectwise.submit_request('time/entries', conditions, fields=fields)]
+
+    @classmethod
+    def fetch_by_business_unit_id(cls, business_unit_id, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = cls._time_start_conditions(on_or_after, before, ['businessUnitId={}'.format(business_unit_id)])
+
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in
+                        Connectwise.submit_request('time/entries', conditions, fields=fields)]
+
+    @classmethod
+    def fetch_by_charge_to_id(cls, charge_to_id, charge_to_type=None, fields=None, compact=False, lazy=False):
+        conditions = cls._charge_to_conditions(charge_to_id, charge_to_type)
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in
+                Connectwise.submit_request('time/entries', conditions, fields=fields)]
 
     @classmethod
-    def fetch_by_charge_to_ids(cls, charge_to_ids, on_or_after=None, before=None):
-        if len(charge_to_ids) > 10:
-            raise IOError('Cannot lookup more than 10 chargeToIds at once')
-        conditions = ['({})'.format(
-            'chargeToId={}'.format(' or chargeToId='.join('{}'.format(_id) for _id in charge_to_ids)))]
-        if on_or_after: conditions.append('timeStart>=[{}]'.format(on_or_after))
-        if before: conditions.append('timeStart<[{}]'.format(before))
-        return [cls(**time_entry) for time_entry in
-                Connectwise.submit_request('time/entries', conditions)]
-
-    def service_location(self, schedule_entries=[], tickets=[], activities=[]):
-        if Connectwise.get_custom_field_value(self, 'Where'): return Connectwise.get_custom_field_value(self, 'Where')
-        schedule_entry = [s.where['name'] for s in schedule_entries
-                          if s.dateStart[:10] == self.timeStart[:10]
-                          and s.objectId == self.chargeToId]
-        if schedule_entry: return schedule_entry[0]
-
-        ticket = [t.serviceLocation['name'] for t in tickets if t.id == self.chargeToId]
-        if ticket: return ticket[0]
-
-        activity = [a.where for a in activities if a.id == self.chargeToId]
-        if activity: return activity[0]
-
-        return 'On-Site'
+    async def fetch_by_charge_to_id_async(cls, client, charge_to_id, charge_to_type=None, fields=None, compact=False, lazy=False):
+        conditions = cls._charge_to_conditions(charge_to_id, charge_to_type)
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in await client.submit_request('time/entries', conditions, fields=fields)]
+
+    @classmethod
+    def fetch_by_charge_to_ids(cls, charge_to_ids, on_or_after=None, before=None, fields=None, compact=False, lazy=False):
+        conditions = cls._time_start_conditions(on_or_after, before)
+        return [record_class(cls, compact, lazy)(**time_entry) for time_entry in
+                Connectwise.submit_chunked_request('time/entries', 'chargeToId', charge_to_ids, conditions, fields=fields)]
+
+    def service_location(self, schedule_entries=[], tickets=[], activities=[], location_index=None):
+        """:param location_index: a ServiceLocationIndex to use instead of the lists"""
+        where = Connectwise.get_custom_field_value(self, 'Where')
+        if where: return where
+        if location_index is None:
+            return ServiceLocationIndex.scan(self.chargeToId, self.timeStart[:10], schedule_entries, tickets, activities)
+        return location_index.lookup(self.chargeToId, self.timeStart[:10])
 
     def actual_days(self):
         return round(self.actualHours / 8, 2)
@@ -148,20 +189,25 @@ class TimeEntry:
             return Decimal(0)
         return Decimal(self.hoursBilled * self.hourlyRate)
 
-    def fetch_estimated_cost(self, members=None, fetch_if_not_found=False):
-
-        if members:
-            try:
-                member = [member for member in members if member.identifier == self.member['identifier']][0]
-            except IndexError:
+    def fetch_estimated_cost(self, members=None, fetch_if_not_found=False, member_registry=None):
+        """:param member_registry: a MemberRegistry to use instead of members"""
+        if member_registry is not None:
+            member = member_registry.get(self.member['identifier'])
+            if member is None:
                 return 0
-        elif fetch_if_not_found:
-            try:
-                member = Member.fetch_member_by_identifier(self.member['identifier'])
-            except IndexError:
+            self.estHourlyCost = Decimal(member_registry.hourly_cost(member, self.timeStart[:10]))
+        elif members:
+            member = next((m for m in members if m.identifier == self.member['identifier']), None)
+            if member is None:
                 return 0
-
-        self.estHourlyCost = Decimal(member.hourly_cost(self.timeStart[:10]))
+            self.estHourlyCost = Decimal(member.hourly_cost(self.timeStart[:10]))
+        else:
+            if fetch_if_not_found:
+                try:
+                    member = Member.fetch_member_by_identifier(self.member['identifier'])
+                except IndexError:
+                    return 0
+            self.estHourlyCost = Decimal(member.hourly_cost(self.timeStart[:10]))
 
         self.override_specific_member_hourly_cost(member)
 
@@ -171,21 +217,34 @@ class TimeEntry:
         self.estCost = round(float(self.estHourlyCost) * self.actualHours, 2)
         return self.estCost
 
+    @staticmethod
+    def fetch_estimated_costs(time_entries, members=[], fetch_if_not_found=False, member_registry=None):
+        """
+        fetch_estimated_cost of every Time Entry in time_entries, looking members up by identifier.
+        :param fetch_if_not_found: fetch the members that are not in members, in batches
+        :return: list of estimated costs, in the same order
+        """
+        if member_registry is None:
+            member_registry = MemberRegistry(members)
+        if fetch_if_not_found:
+            member_registry.fetch_missing(t.member['identifier'] for t in time_entries)
+        return [t.fetch_estimated_cost(member_registry=member_registry) for t in time_entries]
+
     def override_specific_member_hourly_cost(self, member):
         # override this method in a child class in your own project if you need to override self.estHourlyCost
         # for certain Members under specific custom business logic, such as whether or not the Time Entry is
         # Billable and/or occurred during a specific time period
         pass
 
-    def get_schedule_entry(self, schedule_entries):
-        schedule = [s for s in schedule_entries if
-                    s.objectId == self.chargeToId and
-                    s.member['identifier'] == self.member['identifier'] and
-                    s.dateStart <= self.timeStart and s.dateEnd >= self.timeEnd]
-        if schedule: return schedule[0]
+    def get_schedule_entry(self, schedule_entries=[], schedule_index=None):
+        """:param schedule_index: a ScheduleIndex to use instead of schedule_entries"""
+        if schedule_index is None:
+            return ScheduleIndex.scan(schedule_entries, self.chargeToId, self.member['identifier'], self.timeStart,
+                                      self.timeEnd)
+        return schedule_index.schedule_entry(self)
 
-    def get_schedule_duration_per_day(self, schedule_entries):
-        schedule_entry = self.get_schedule_entry(schedule_entries)
+    def get_schedule_duration_per_day(self, schedule_entries=[], schedule_index=None):
+        schedule_entry = self.get_schedule_entry(schedule_entries, schedule_index)
         if schedule_entry:
             return schedule_entry.days() / schedule_entry.calendar_days()
         return 0
@@ -197,14 +256,17 @@ class TimeEntry:
         return Connectwise.get_charge_to_info(self, tickets, activities, charge_codes, return_type, include_company,
                                               include_project_name, include_phase, bold_first_item)
 
-    def fetch_system_report(self, system_reports=[], fetch_if_not_found=False):
-        if len(system_reports) == 0 and fetch_if_not_found:
-            return TimeReport.fetch_by_time_entry_id(self.id)
+    def fetch_system_report(self, system_reports=[], fetch_if_not_found=False, report_index=None):
+        """
+        :param report_index: a TimeReportIndex to use instead of system_reports. Time Entries without
+        a report are recorded in its stats() rather than printed
+        """
+        if report_index is None:
+            if len(system_reports) == 0 and fetch_if_not_found:
+                return TimeReport.fetch_by_time_entry_id(self.id)
+            report = next((r for r in system_reports if r.Time_RecID == self.id), None)
         else:
-            report = [r for r in system_reports if r.Time_RecID == self.id]
-            if len(report) > 0:
-                self.system_report = report[0]
-                return self.system_report
-            else:
-                print('Missing System Report for time entry {}'.format(self.id))
-                return None
+            report = report_index.get(self.id)
+        if report is not None:
+            self.system_report = report
+        return report
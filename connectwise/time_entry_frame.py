@@ -0,0 +1,157 @@
+from decimal import Decimal
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = pd = None
+
+from .connectwise import Connectwise
+
+
+class TimeEntryFrame:
+    """
+    Column-oriented TimeEntries backed by a pandas DataFrame, for billing math over large pulls.
+    actual_days, daily_rate, billable_amount and estimated_cost give the same values as the
+    TimeEntry methods of the same names, computed over whole columns at once.
+
+        frame = TimeEntryFrame.fetch_by_date_range('2017-07-01', '2018-07-01')
+        frame.billable_amount().sum()
+
+    Needs pandas and numpy, which the rest of the package does not.
+    """
+    FIELDS = ['id', 'company', 'chargeToId', 'chargeToType', 'member', 'workType', 'timeStart', 'actualHours',
+              'hoursBilled', 'hourlyRate', 'billableOption']
+    # column: path into the time entry record
+    COLUMNS = {
+        'id': ('id',),
+        'company_id': ('company', 'id'),
+        'chargeToId': ('chargeToId',),
+        'chargeToType': ('chargeToType',),
+        'member_identifier': ('member', 'identifier'),
+        'workType_name': ('workType', 'name'),
+        'timeStart': ('timeStart',),
+        'actualHours': ('actualHours',),
+        'hoursBilled': ('hoursBilled',),
+        'hourlyRate': ('hourlyRate',),
+        'billableOption': ('billableOption',),
+    }
+    NUMERIC_COLUMNS = ['actualHours', 'hoursBilled', 'hourlyRate']
+
+    def __init__(self, df):
+        if pd is None:
+            raise ImportError('TimeEntryFrame needs pandas and numpy installed')
+        self.df = df
+
+    def __repr__(self):
+        return "<Time Entry Frame {} entries>".format(len(self.df))
+
+    def __len__(self):
+        return len(self.df)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from raw time entry records, e.g. Connectwise.iter_request('time/entries', ...), one at a time"""
+        columns = {column: [] for column in cls.COLUMNS}
+        for record in records:
+            for column, path in cls.COLUMNS.items():
+                value = record
+                for key in path:
+                    value = value.get(key) if isinstance(value, dict) else None
+                columns[column].append(value)
+        if pd is None:
+            raise ImportError('TimeEntryFrame needs pandas and numpy installed')
+        return cls(cls._typed(pd.DataFrame(columns)))
+
+    @classmethod
+    def from_time_entries(cls, time_entries):
+        return cls.from_records(vars(t) for t in time_entries)
+
+    @classmethod
+    def fetch_by_date_range(cls, on_or_after=None, before=None):
+        conditions = []
+        if on_or_after:
+            conditions.append('timeStart>=[{}]'.format(on_or_after))
+        if before:
+            conditions.append('timeStart<[{}]'.format(before))
+        return cls.from_records(Connectwise.iter_request('time/entries', conditions, fields=cls.FIELDS))
+
+    @classmethod
+    def _typed(cls, df):
+        for column in cls.COLUMNS:
+            if column in cls.NUMERIC_COLUMNS:
+                df[column] = pd.to_numeric(df[column]).astype(float)
+            elif df.empty:
+                # an empty column would otherwise be float64, and .str would not work on it
+                df[column] = df[column].astype(object)
+        return df
+
+    @staticmethod
+    def _round(series, digits=2):
+        """
+        round(x, digits) over a whole column. np.round scales by 10**digits before rounding, which lands on
+        the other side of a half for some floats (0.1 * 55.55 is 5.555 to np.round but 5.55499.. to round()),
+        so the few values that scale to within a hair of a half are rounded again the way the scalar methods do
+        """
+        scaled = series * 10 ** digits
+        rounded = np.round(scaled) / 10 ** digits
+        near_half = (scaled - np.floor(scaled) - 0.5).abs() < 1e-6
+        if near_half.any():
+            rounded[near_half] = [round(x, digits) for x in series[near_half]]
+        return rounded.astype(float)
+
+    def actual_days(self):
+        return self._round(self.df['actualHours'] / 8)
+
+    def daily_rate(self):
+        return self.df['hourlyRate'] * 8
+
+    def billable_amount(self):
+        amount = self.df['hoursBilled'] * self.df['hourlyRate']
+        return amount.where(self.df['billableOption'] == 'Billable', 0.0)
+
+    def fiscal_years(self):
+        """Start year of the FY each entry falls in, matching Member.hourly_cost (FY starts in July)"""
+        year = self.df['timeStart'].str[:4].astype(int)
+        month = self.df['timeStart'].str[5:7].astype(int)
+        return year - (month < 7)
+
+    def estimated_hourly_cost(self, members):
+        """
+        Hourly cost per entry, halved for Professional Development, like TimeEntry.estHourlyCost.
+        Member.hourly_cost only depends on the FY (and whether the date is in the current FY),
+        so it is called once per (member, FY), and the results are joined back onto the entries.
+        TimeEntry.override_specific_member_hourly_cost is not applied.
+        """
+        if self.df.empty:
+            return pd.Series(index=self.df.index, dtype=float)
+        members = {m.identifier: m for m in members}
+        dates = self.df['timeStart'].str[:10]
+        keys = pd.DataFrame({'identifier': self.df['member_identifier'], 'fy': self.fiscal_years(),
+                             'current': dates >= Connectwise.current_fy()[0], 'date': dates})
+        costs = keys.drop_duplicates(['identifier', 'fy', 'current'])
+        hourly_costs = [Decimal(members[identifier].hourly_cost(on_date)) if identifier in members else None
+                        for identifier, on_date in zip(costs['identifier'], costs['date'])]
+        costs = costs.assign(
+            cost=[float(cost) if cost is not None else np.nan for cost in hourly_costs],
+            pd_cost=[float(round(cost / 2, 2)) if cost is not None else np.nan for cost in hourly_costs],
+        ).drop(columns='date')
+        joined = keys.merge(costs, on=['identifier', 'fy', 'current'], how='left')
+
+        is_pd = (self.df['workType_name'] == 'Professional Development').to_numpy()
+        return pd.Series(np.where(is_pd, joined['pd_cost'], joined['cost']), index=self.df.index)
+
+    def estimated_cost(self, members):
+        """Like TimeEntry.fetch_estimated_cost(members): 0 for entries whose member is not in members"""
+        cost = self._round(self.estimated_hourly_cost(members) * self.df['actualHours'])
+        return cost.fillna(0)
+
+    def to_frame(self, members=None):
+        """The underlying columns plus every calculated column"""
+        df = self.df.copy()
+        df['actual_days'] = self.actual_days()
+        df['daily_rate'] = self.daily_rate()
+        df['billable_amount'] = self.billable_amount()
+        if members is not None:
+            df['estimated_cost'] = self.estimated_cost(members)
+        return df
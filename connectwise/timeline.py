@@ -0,0 +1,80 @@
+from datetime import datetime
+
+
+class Timeline:
+    """
+    Buckets entries of any kind by day, and optionally by member or company within each day, in one
+    pass over each list. Each entry's date is read once, from the field named in DATE_FIELDS.
+
+        timeline = Timeline(schedule_entries=schedule_entries, time_entries=time_entries)
+        timeline.days(by='member')
+
+    returns one dict per day that has any entries, oldest first:
+
+        {'date': datetime, 'members': [{'member_identifier': 'jsmith', 'schedule_entries': [...], 'time_entries': [...]}]}
+
+    or, without by, {'date': datetime, 'schedule_entries': [...], 'time_entries': [...]}.
+    Entries keep the order of the lists they came from.
+    """
+    DATE_FIELDS = {
+        'schedule_entries': 'dateStart',
+        'time_entries': 'timeStart',
+        'expense_entries': 'date',
+        'invoices': 'date',
+        'products': 'purchaseDate',
+    }
+    # by: (key of the list of groups, key of the group's value, field, subfield)
+    GROUPINGS = {
+        'member': ('members', 'member_identifier', 'member', 'identifier'),
+        'company': ('companies', 'company_id', 'company', 'id'),
+    }
+
+    def __init__(self, **entries):
+        """
+        :param entries: lists of entries keyed by kind, e.g. time_entries=[...]. Kinds not in DATE_FIELDS
+        can be given as a tuple of (entries, date field)
+        """
+        self.kinds = []
+        self._days = {}
+        for kind, kind_entries in entries.items():
+            if isinstance(kind_entries, tuple):
+                kind_entries, date_field = kind_entries
+            else:
+                date_field = self.DATE_FIELDS[kind]
+            self.kinds.append(kind)
+            for entry in kind_entries:
+                day = getattr(entry, date_field)[:10]
+                self._days.setdefault(day, {}).setdefault(kind, []).append(entry)
+
+    def __repr__(self):
+        return "<Timeline {} days>".format(len(self._days))
+
+    def dates(self, on_or_after=None, until=None):
+        """The 'YYYY-MM-DD' days that have any entries, oldest first, optionally limited to on_or_after to until inclusive"""
+        return [day for day in sorted(self._days)
+                if (on_or_after is None or day >= on_or_after) and (until is None or day <= until)]
+
+    def days(self, by=None, on_or_after=None, until=None):
+        """
+        :param by: None, 'member' or 'company'
+        :param on_or_after: first day to include, 'YYYY-MM-DD'
+        :param until: last day to include, 'YYYY-MM-DD'
+        """
+        timeline = []
+        for day in self.dates(on_or_after, until):
+            kinds = self._days[day]
+            if by is None:
+                bucket = {'date': datetime.strptime(day, '%Y-%m-%d')}
+                bucket.update((kind, kinds.get(kind, [])) for kind in self.kinds)
+            else:
+                groups_key, group_key, field, subfield = self.GROUPINGS[by]
+                groups = {}
+                for kind in self.kinds:
+                    for entry in kinds.get(kind, []):
+                        value = getattr(entry, field)[subfield]
+                        if value not in groups:
+                            groups[value] = {group_key: value, **{k: [] for k in self.kinds}}
+                        groups[value][kind].append(entry)
+                bucket = {'date': datetime.strptime(day, '%Y-%m-%d'), groups_key: list(groups.values())}
+            timeline.append(bucket)
+        return timeline